@@ -0,0 +1,157 @@
+"""Offline stand-ins for the provider SDK clients.
+
+`install()` registers an import hook that swaps `google.genai.Client` and
+`openai.OpenAI` for canned fakes the moment those modules are imported, so
+the benchmark still pays their real import cost but never touches the
+network.
+"""
+
+import base64
+import importlib.abc
+import importlib.machinery
+import struct
+import sys
+import zlib
+from types import SimpleNamespace
+
+
+def _png_1x1():
+    def chunk(kind, data):
+        body = kind + data
+        return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+    ihdr = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    idat = zlib.compress(b"\x00\xff\xff\xff")
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", ihdr)
+        + chunk(b"IDAT", idat)
+        + chunk(b"IEND", b"")
+    )
+
+
+PNG = _png_1x1()
+TEXT = "stub response"
+
+
+def _response(model=""):
+    # google.genai is already imported by the time a client is asked for one
+    from google.genai import types
+
+    parts = [types.Part(text=TEXT)]
+    if "image" in model:
+        parts.append(types.Part.from_bytes(data=PNG, mime_type="image/png"))
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=parts))]
+    )
+
+
+class _Models:
+    def generate_content(self, model="", **kwargs):
+        return _response(model)
+
+    def generate_content_stream(self, model="", **kwargs):
+        yield _response(model)
+
+    def count_tokens(self, **kwargs):
+        return SimpleNamespace(total_tokens=1)
+
+
+class _AsyncModels:
+    async def generate_content(self, model="", **kwargs):
+        return _response(model)
+
+
+class _Aio:
+    def __init__(self):
+        self.models = _AsyncModels()
+
+    async def aclose(self):
+        pass
+
+
+class _Files:
+    def upload(self, file=None, **kwargs):
+        return SimpleNamespace(
+            name="files/stub",
+            uri="https://example.invalid/files/stub",
+            mime_type="application/octet-stream",
+        )
+
+
+class _Interactions:
+    def create(self, **kwargs):
+        return SimpleNamespace(id="stub-interaction", status="in_progress")
+
+    def get(self, interaction_id, **kwargs):
+        return SimpleNamespace(
+            id=interaction_id, status="completed", steps=[], output_text=TEXT
+        )
+
+
+class _Caches:
+    def create(self, model=None, config=None, **kwargs):
+        return SimpleNamespace(name="cachedContents/stub", expire_time=None)
+
+
+class GenaiClient:
+    def __init__(self, *args, **kwargs):
+        self.models = _Models()
+        self.files = _Files()
+        self.interactions = _Interactions()
+        self.aio = _Aio()
+        self.caches = _Caches()
+
+
+class _Images:
+    def _result(self, n=1, **kwargs):
+        b64 = base64.b64encode(PNG).decode()
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=b64)] * n)
+
+    generate = _result
+    edit = _result
+
+
+class OpenAIClient:
+    def __init__(self, *args, **kwargs):
+        self.images = _Images()
+
+
+def _patch_genai(module):
+    module.Client = GenaiClient
+
+
+def _patch_openai(module):
+    module.OpenAI = OpenAIClient
+
+
+PATCHES = {"google.genai": _patch_genai, "openai": _patch_openai}
+
+
+class _PatchingLoader(importlib.abc.Loader):
+    def __init__(self, loader, patch):
+        self.loader = loader
+        self.patch = patch
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.loader.exec_module(module)
+        self.patch(module)
+
+
+class _PatchingFinder(importlib.abc.MetaPathFinder):
+    def find_spec(self, fullname, path, target=None):
+        patch = PATCHES.get(fullname)
+        if patch is None:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(fullname, path)
+        if spec is None or spec.loader is None:
+            return spec
+        spec.loader = _PatchingLoader(spec.loader, patch)
+        return spec
+
+
+def install():
+    sys.meta_path.insert(0, _PatchingFinder())
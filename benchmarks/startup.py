@@ -0,0 +1,269 @@
+"""Cold-start benchmark for every gski subcommand.
+
+Runs `gski <cmd> --help` and an offline dry run of each subcommand in a
+fresh interpreter, recording median wall time, peak RSS and the `-X
+importtime` breakdown. Provider clients are replaced by the fakes in
+`_stubs.py`, so nothing here touches the network.
+
+    python benchmarks/startup.py                  # check budgets
+    python benchmarks/startup.py --save base.json # record a baseline
+    python benchmarks/startup.py --baseline base.json
+
+Exits non-zero when a case fails, imports a heavy module it has no business
+importing, or regresses past the configured thresholds.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+from gski.cli import COMMANDS  # noqa: E402
+
+from _stubs import PNG  # noqa: E402
+
+BOOT = (
+    "import sys; sys.path.insert(0, {bench!r}); "
+    "import _stubs; _stubs.install(); "
+    "from gski.cli import main; main()"
+)
+
+HEAVY = ("google.genai", "openai", "numpy", "PIL")
+
+# google.genai pulls in PIL on its own, so every Gemini command gets it too.
+ALLOWED_HEAVY = {
+    "audioscope": {"google.genai", "PIL"},
+    "deepresearch": {"google.genai", "PIL"},
+    "gptimage2": {"openai", "PIL"},
+    "llm-process": {"google.genai", "PIL"},
+    "nanobanana": {"google.genai", "PIL"},
+    "nanoscope": {"google.genai", "PIL", "numpy"},
+    "serve": set(),
+    "setup": set(),
+    "solver": set(),
+    "websearch": {"google.genai", "PIL"},
+    "youtube-scope": set(),
+}
+
+# Commands that import nothing heavy must start within this many ms of a
+# bare `python -c pass`.
+LIGHT_BUDGET_MS = 100
+
+# Relative and absolute slack allowed over a saved baseline.
+TOLERANCE = 0.25
+SLACK_MS = 15
+SLACK_RSS_MB = 5
+
+
+def dry_runs(fixtures):
+    """Offline invocation per subcommand; None where there is no such path."""
+    return {
+        "audioscope": ["audioscope", "--audio", str(fixtures["audio"])],
+        "deepresearch": ["deepresearch", "start", "benchmark query"],
+        "gptimage2": ["gptimage2", "a red square", "--format", "png"],
+        "llm-process": ["llm-process", "summarize", "-f", str(fixtures["text"])],
+        "nanobanana": ["nanobanana", "a red square", "--format", "png"],
+        "nanoscope": ["nanoscope", "describe", "--image", str(fixtures["image"])],
+        # long-lived; only --help is measured
+        "serve": None,
+        "setup": ["setup", str(fixtures["root"] / "skills")],
+        "solver": ["solver", "triz", "--list", "params"],
+        "websearch": ["websearch", "benchmark query"],
+        # every useful path shells out to yt-dlp
+        "youtube-scope": None,
+    }
+
+
+def make_fixtures(root):
+    text = root / "input.txt"
+    text.write_text("hello world\n" * 100)
+    image = root / "image.png"
+    image.write_bytes(PNG)
+    audio = root / "audio.wav"
+    audio.write_bytes(b"RIFF" + b"\x00" * 1024)
+    return {"root": root, "text": text, "image": image, "audio": audio}
+
+
+def make_env(root):
+    env = dict(os.environ)
+    env.update(
+        GEMINI_API_KEY="stub",
+        OPENAI_API_KEY="stub",
+        XDG_STATE_HOME=str(root / "state"),
+        PYTHONDONTWRITEBYTECODE="1",
+        GSKI_NO_DAEMON="1",
+        GSKI_NO_CACHE="1",
+        XDG_CACHE_HOME=str(root / "cache"),
+    )
+    env.pop("_ARGCOMPLETE", None)
+    return env
+
+
+def run_once(argv, env, cwd, importtime=False):
+    cmd = [sys.executable]
+    if importtime:
+        cmd += ["-X", "importtime"]
+    cmd += ["-c", BOOT.format(bench=str(BENCH_DIR)), *argv]
+
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        cmd,
+        env=env,
+        cwd=cwd,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE if importtime else subprocess.DEVNULL,
+    )
+    stderr = proc.stderr.read().decode() if importtime else ""
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall_ms = (time.perf_counter() - t0) * 1000
+    proc.returncode = os.waitstatus_to_exitcode(status)
+
+    rss_kb = usage.ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+    return proc.returncode, wall_ms, rss_kb / 1024, stderr
+
+
+def parse_importtime(stderr):
+    """Return {module: cumulative_us} and the top-level entries in order."""
+    modules = {}
+    top = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        try:
+            us = int(cumulative)
+        except ValueError:
+            continue  # header line
+        modules[name.strip()] = us
+        if not name.startswith("  "):
+            top.append((name.strip(), us))
+    return modules, top
+
+
+def measure(argv, env, cwd, repeat):
+    code, _, _, stderr = run_once(argv, env, cwd, importtime=True)
+    modules, top = parse_importtime(stderr)
+    walls, rss = [], []
+    for _ in range(repeat):
+        code, wall, peak, _ = run_once(argv, env, cwd)
+        walls.append(wall)
+        rss.append(peak)
+    return {
+        "returncode": code,
+        "wall_ms": round(statistics.median(walls), 1),
+        "rss_mb": round(max(rss), 1),
+        "import_ms": round(sum(us for _, us in top) / 1000, 1),
+        "top_imports": sorted(top, key=lambda x: -x[1])[:5],
+        "modules": modules,
+    }
+
+
+def baseline_interpreter(env, cwd, repeat):
+    walls = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], env=env, cwd=cwd, check=True)
+        walls.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(walls)
+
+
+def heavy_imports(modules):
+    return {h for h in HEAVY if h in modules}
+
+
+def check(name, command, result, interp_ms, baseline):
+    problems = []
+    if result["returncode"] != 0:
+        problems.append(f"exited {result['returncode']}")
+
+    extra = heavy_imports(result["modules"]) - ALLOWED_HEAVY[command]
+    if extra:
+        problems.append(f"imports {', '.join(sorted(extra))}")
+
+    if not ALLOWED_HEAVY[command]:
+        overhead = result["wall_ms"] - interp_ms
+        if overhead > LIGHT_BUDGET_MS:
+            problems.append(
+                f"startup {overhead:.0f}ms over interpreter (budget {LIGHT_BUDGET_MS}ms)"
+            )
+
+    ref = baseline.get(name) if baseline else None
+    if ref:
+        limit = ref["wall_ms"] * (1 + TOLERANCE) + SLACK_MS
+        if result["wall_ms"] > limit:
+            problems.append(f"wall {result['wall_ms']}ms > {limit:.0f}ms")
+        limit = ref["rss_mb"] * (1 + TOLERANCE) + SLACK_RSS_MB
+        if result["rss_mb"] > limit:
+            problems.append(f"rss {result['rss_mb']}MB > {limit:.0f}MB")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", "-n", type=int, default=5, help="runs per case")
+    parser.add_argument("--baseline", help="compare against a saved baseline JSON")
+    parser.add_argument("--save", help="write results as a baseline JSON")
+    parser.add_argument(
+        "--only", action="append", default=[], help="limit to subcommand(s)"
+    )
+    parser.add_argument(
+        "--verbose", "-v", action="store_true", help="print import breakdown"
+    )
+    args = parser.parse_args()
+
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    commands = [c for c in COMMANDS if not args.only or c in args.only]
+
+    with tempfile.TemporaryDirectory(prefix="gski-bench-") as tmp:
+        root = Path(tmp)
+        fixtures = make_fixtures(root)
+        env = make_env(root)
+        runs = dry_runs(fixtures)
+        interp_ms = baseline_interpreter(env, root, args.repeat)
+
+        print(f"interpreter: {interp_ms:.1f}ms\n")
+        print(f"{'CASE':<28}  {'WALL':>8}  {'IMPORT':>8}  {'RSS':>7}  STATUS")
+
+        results = {}
+        failed = False
+        for command in commands:
+            cases = [(f"{command} --help", [command, "--help"])]
+            if runs[command]:
+                cases.append((f"{command} dry-run", runs[command]))
+            for name, argv in cases:
+                result = measure(argv, env, root, args.repeat)
+                problems = check(name, command, result, interp_ms, baseline)
+                failed = failed or bool(problems)
+                status = "; ".join(problems) if problems else "ok"
+                print(
+                    f"{name:<28}  {result['wall_ms']:>6.1f}ms  "
+                    f"{result['import_ms']:>6.1f}ms  {result['rss_mb']:>5.1f}MB  "
+                    f"{status}"
+                )
+                if args.verbose:
+                    for mod, us in result["top_imports"]:
+                        print(f"    {us / 1000:>8.1f}ms  {mod}")
+                results[name] = {
+                    k: result[k] for k in ("wall_ms", "rss_mb", "import_ms")
+                }
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nbaseline written to {args.save}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,14 +4,19 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-from google import genai
 from google.genai import types
 
+from . import response_cache
+from .clients import gemini_client
 from .models import GEMINI_TEXT
+from .preflight import file_tokens, plan_uploads, print_estimate, text_tokens
+from .uploads import uploaded_part
 
 
 MODELS = {k: GEMINI_TEXT[k] for k in ("flash", "pro")}
 
+RESPONSE_TTL = 7 * 24 * 3600
+
 PROMPT_TRANSCRIBE = "Generate a transcript of the speech."
 
 PROMPT_TRANSCRIBE_TS = (
@@ -101,13 +106,16 @@ def build_config(args):
     )
 
 
-def build_contents(prompt, audio_paths, youtube_urls):
+def build_contents(prompt, audio_paths, youtube_urls, client=None, upload=()):
     contents = []
 
     for p in audio_paths:
+        mime = _mime_type(p)
+        if p in upload:
+            contents.append(uploaded_part(client, p, mime))
+            continue
         with open(p, "rb") as f:
             data = f.read()
-        mime = _mime_type(p)
         contents.append(types.Part.from_bytes(data=data, mime_type=mime))
 
     for url in youtube_urls:
@@ -117,19 +125,6 @@ def build_contents(prompt, audio_paths, youtube_urls):
     return contents
 
 
-def build_contents_uploaded(prompt, uploaded_files, youtube_urls):
-    contents = []
-
-    for f in uploaded_files:
-        contents.append(f)
-
-    for url in youtube_urls:
-        contents.append(types.Part(file_data=types.FileData(file_uri=url)))
-
-    contents.append(prompt)
-    return contents
-
-
 def _mime_type(path):
     ext = Path(path).suffix.lower()
     return {
@@ -142,10 +137,6 @@ def _mime_type(path):
     }.get(ext, "audio/mpeg")
 
 
-def _file_size(paths):
-    return sum(os.path.getsize(p) for p in paths)
-
-
 def format_diarize(data):
     lines = []
     if data.get("summary"):
@@ -204,12 +195,19 @@ def register(subparsers):
         default="./output",
         help="output directory for saving results (default: ./output)",
     )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print estimated tokens, cost and latency without transcribing",
+    )
+    p.add_argument(
+        "--fresh",
+        action="store_true",
+        help="ignore cached responses and always call the API",
+    )
     p.set_defaults(func=run)
 
 
-UPLOAD_THRESHOLD = 15 * 1024 * 1024  # 15 MB — leave room for prompt overhead
-
-
 def run(args):
     if not args.audio and not args.youtube:
         print("error: at least one --audio or --youtube required", file=sys.stderr)
@@ -220,25 +218,32 @@ def run(args):
             print(f"error: audio file not found: {p}", file=sys.stderr)
             sys.exit(1)
 
-    if not os.environ.get("GEMINI_API_KEY"):
+    if not args.dry_run and not os.environ.get("GEMINI_API_KEY"):
         print("error: GEMINI_API_KEY env var required", file=sys.stderr)
         sys.exit(1)
 
     prompt = args.prompt or default_prompt(args)
-    client = genai.Client()
     model = MODELS[args.model]
+    upload = plan_uploads(args.audio, set(args.audio), len(prompt))
+
+    if args.dry_run:
+        tokens = text_tokens(prompt) + sum(
+            file_tokens(p, _mime_type(p)) for p in args.audio
+        )
+        print_estimate(model, tokens, uploads=sorted(upload))
+        if args.youtube:
+            print(f"note:      {len(args.youtube)} YouTube URL(s) not estimated")
+        return
+
+    client = gemini_client()
     config = build_config(args)
+    contents = build_contents(prompt, args.audio, args.youtube, client, upload)
 
-    if args.audio and _file_size(args.audio) > UPLOAD_THRESHOLD:
-        uploaded = []
-        for p in args.audio:
-            print(f"uploading {p}...", file=sys.stderr)
-            uploaded.append(client.files.upload(file=p))
-        contents = build_contents_uploaded(prompt, uploaded, args.youtube)
-    else:
-        contents = build_contents(prompt, args.audio, args.youtube)
-
-    response = client.models.generate_content(
+    response = response_cache.generate(
+        client,
+        "audioscope",
+        RESPONSE_TTL,
+        fresh=args.fresh,
         model=model,
         contents=contents,
         config=config,
@@ -1,40 +1,135 @@
 import argparse
+import importlib
+import os
+import shlex
 import sys
 
-import argcomplete
+# name -> (module, help). Only the module for the dispatched subcommand is
+# imported; the rest get a bare placeholder parser so `gski -h` still lists
+# them without pulling in google.genai / openai / PIL.
+COMMANDS = {
+    "audioscope": ("gski.audioscope", "transcribe and diarize audio via Gemini"),
+    "deepresearch": (
+        "gski.deepresearch",
+        "Gemini Deep Research agent — async long-running research tasks",
+    ),
+    "gptimage2": ("gski.gptimage2", "generate or edit images via OpenAI GPT Image"),
+    "llm-process": ("gski.llm_process", "process files and text with Gemini"),
+    "nanobanana": ("gski.nanobanana", "generate or edit images via Gemini"),
+    "nanoscope": ("gski.nanoscope", "understand and analyze images via Gemini"),
+    "serve": (
+        "gski.serve",
+        "run a resident daemon that keeps clients warm for other invocations",
+    ),
+    "setup": ("gski.setup", "copy SKILL.md files to target directory"),
+    "solver": ("gski.solver", "creative problem-solving toolkit"),
+    "websearch": (
+        "gski.websearch",
+        "search the web via Gemini with Google Search grounding",
+    ),
+    "youtube-scope": (
+        "gski.youtube_scope",
+        "extract data from YouTube — metadata, comments, transcripts",
+    ),
+}
 
+# (command, word) -> module for second-level commands that can't live under
+# the command's own parser (llm-process takes an optional positional prompt).
+NESTED = {
+    ("llm-process", "batch"): "gski.llm_batch",
+}
 
-def main():
+# (command, word) pairs that always run in their own process instead of on
+# the `gski serve` daemon: long-lived loops that own their signals.
+LOCAL = {
+    ("deepresearch", "daemon"),
+}
+
+
+def _argv_words():
+    if "_ARGCOMPLETE" in os.environ:
+        line = os.environ.get("COMP_LINE", "")
+        point = int(os.environ.get("COMP_POINT", len(line)))
+        try:
+            return shlex.split(line[:point])[1:]
+        except ValueError:
+            return []
+    return sys.argv[1:]
+
+
+def selected_command(words):
+    for w in words:
+        if w.startswith("-"):
+            continue
+        return w if w in COMMANDS else None
+    return None
+
+
+def _next_word(words, command):
+    if command not in words:
+        return None
+    i = words.index(command)
+    return words[i + 1] if i + 1 < len(words) else None
+
+
+def nested_command(words, command):
+    """Module for `gski <command> <word> ...` if that pair is in NESTED. The
+    word has to follow the command directly."""
+    return NESTED.get((command, _next_word(words, command)))
+
+
+def load_command(name):
+    module, _ = COMMANDS[name]
+    return importlib.import_module(module)
+
+
+def build_parser(selected=None, nested=None):
     parser = argparse.ArgumentParser(prog="gski")
     sub = parser.add_subparsers(dest="command")
 
-    from gski.audioscope import register as as_register
-    from gski.deepresearch import register as dr_register
-    from gski.gptimage2 import register as gi_register
-    from gski.llm_process import register as lp_register
-    from gski.nanobanana import register as nb_register
-    from gski.nanoscope import register as ns_register
-    from gski.setup import register as setup_register
-    from gski.websearch import register as ws_register
-    from gski.solver import register as sv_register
-    from gski.youtube_scope import register as ys_register
-
-    as_register(sub)
-    dr_register(sub)
-    gi_register(sub)
-    lp_register(sub)
-    nb_register(sub)
-    ns_register(sub)
-    setup_register(sub)
-    sv_register(sub)
-    ws_register(sub)
-    ys_register(sub)
-
-    argcomplete.autocomplete(parser)
-    args = parser.parse_args()
+    for name, (_, help_text) in COMMANDS.items():
+        if name == selected and nested:
+            p = sub.add_parser(name, help=help_text)
+            importlib.import_module(nested).register(p.add_subparsers(dest="nested"))
+        elif name == selected:
+            load_command(name).register(sub)
+        else:
+            sub.add_parser(name, help=help_text)
+
+    return parser
+
+
+def dispatch(argv):
+    command = selected_command(argv)
+    parser = build_parser(command, nested_command(argv, command))
+    args = parser.parse_args(argv)
 
     if not args.command:
         parser.print_help()
         sys.exit(1)
 
     args.func(args)
+
+
+def main():
+    if "_ARGCOMPLETE" in os.environ:
+        import argcomplete
+
+        words = _argv_words()
+        command = selected_command(words)
+        argcomplete.autocomplete(
+            build_parser(command, nested_command(words, command))
+        )
+
+    argv = sys.argv[1:]
+    command = selected_command(argv)
+    local = command == "serve" or (command, _next_word(argv, command)) in LOCAL
+    if command and not local and not os.environ.get("GSKI_NO_DAEMON"):
+        from gski.serve import forward, socket_path
+
+        if os.path.exists(socket_path()):
+            code = forward(argv)
+            if code is not None:
+                sys.exit(code)
+
+    dispatch(argv)
@@ -0,0 +1,29 @@
+import functools
+import os
+import sys
+
+
+def new_gemini_client():
+    from google import genai
+
+    return genai.Client()
+
+
+@functools.cache
+def gemini_client():
+    return new_gemini_client()
+
+
+def make_client():
+    """The shared Gemini client, exiting with an error if no API key is set."""
+    if not os.environ.get("GEMINI_API_KEY"):
+        print("error: GEMINI_API_KEY env var required", file=sys.stderr)
+        sys.exit(1)
+    return gemini_client()
+
+
+@functools.cache
+def openai_client():
+    from openai import OpenAI
+
+    return OpenAI()
@@ -0,0 +1,84 @@
+import hashlib
+import json
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from google.genai import errors, types
+
+from .paths import CACHE_DIR, write_atomic
+from .uploads import file_sha256
+
+INDEX_PATH = CACHE_DIR / "contexts.json"
+
+DEFAULT_TTL_MINUTES = 60
+EXPIRY_MARGIN = timedelta(minutes=1)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def load_index():
+    try:
+        return json.loads(INDEX_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_index(index):
+    now = _now()
+    live = {
+        k: e for k, e in index.items() if datetime.fromisoformat(e["expires_at"]) > now
+    }
+    write_atomic(INDEX_PATH, json.dumps(live, indent=2))
+
+
+def context_key(model, file_paths, system):
+    files = [(Path(fp).name, file_sha256(fp)) for fp in file_paths]
+    blob = json.dumps({"model": model, "system": system, "files": files})
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+
+def cached_context(client, model, file_paths, system, ttl_minutes, load_parts):
+    """Return the name of a cached-content object holding `file_paths` and
+    `system`, creating one if there is no live cache for that content.
+    `load_parts` builds the file parts and is only called on a miss. Returns
+    None if the API refuses to cache (e.g. below the minimum token count)."""
+    key = context_key(model, file_paths, system)
+    index = load_index()
+
+    entry = index.get(key)
+    if entry and datetime.fromisoformat(entry["expires_at"]) - EXPIRY_MARGIN > _now():
+        return entry["name"]
+
+    kwargs = {
+        "contents": load_parts(),
+        "ttl": f"{ttl_minutes * 60}s",
+        "display_name": f"gski-{key[:12]}",
+    }
+    if system:
+        kwargs["system_instruction"] = system
+
+    print("creating context cache...", file=sys.stderr)
+    try:
+        cache = client.caches.create(
+            model=model, config=types.CreateCachedContentConfig(**kwargs)
+        )
+    except errors.APIError as e:
+        print(
+            f"  ! context caching unavailable ({e}); sending full prompt",
+            file=sys.stderr,
+        )
+        return None
+
+    expires = getattr(cache, "expire_time", None) or (
+        _now() + timedelta(minutes=ttl_minutes)
+    )
+    index[key] = {
+        "name": cache.name,
+        "model": model,
+        "expires_at": expires.isoformat(),
+    }
+    save_index(index)
+    return cache.name
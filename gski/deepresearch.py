@@ -1,39 +1,89 @@
+import asyncio
+import signal
 import sys
+import time
 from pathlib import Path
 
+from gski.clients import make_client, new_gemini_client
 from gski.deepresearch_lib.api import (
     AGENT_MODELS,
+    StreamState,
+    apoll,
     build_input,
     extract_text,
+    follow,
     interactions_create,
-    make_client,
     new_interaction_id,
     poll,
+    stream_create,
 )
 from gski.deepresearch_lib.format import fmt_age, print_job_header, print_job_row
+from gski.deepresearch_lib.hooks import Hook
 from gski.deepresearch_lib.resolve import resolve_text
 from gski.deepresearch_lib.state import (
+    JobConflict,
     all_jobs,
+    daemon_lock,
+    job_lock,
     load_job,
     new_job,
+    now_iso,
+    partial_path_for,
     record_interaction,
     remove_job,
     report_path_for,
     save_job,
     save_report,
+    update_job,
 )
 
 
-def _write_report(job, text, output):
+def _finish(job, text, output):
+    """Mark the job completed and save its report, unless another process
+    has already collected this interaction or moved the job on."""
+    iid = job["current_interaction_id"]
     text = resolve_text(text)
-    internal = save_report(job, text)
-    save_job(job)
+
+    def complete(current):
+        if current["current_interaction_id"] != iid or current["state"] == "completed":
+            return False
+        current["state"] = "completed"
+        save_report(current, text)
+
+    try:
+        saved = update_job(job, complete)
+    except JobConflict as e:
+        print(f"  ! {e}; report not saved", file=sys.stderr)
+        return False
+    if not saved:
+        print(
+            f"job {job['job_id']} was updated by another process "
+            f"(state: {job['state']}); not overwriting",
+            file=sys.stderr,
+        )
+        return False
     if output:
         out = Path(output)
         out.write_text(text)
         print(f"report written to {out}")
     else:
-        print(f"report saved to {internal}")
+        print(f"report saved to {job['report_path']}")
+    return True
+
+
+def _fail(job):
+    iid = job["current_interaction_id"]
+
+    def mark(current):
+        if current["current_interaction_id"] != iid or current["state"] == "completed":
+            return False
+        current["state"] = "failed"
+
+    try:
+        return update_job(job, mark)
+    except JobConflict as e:
+        print(f"  ! {e}; not marked failed", file=sys.stderr)
+        return False
 
 
 def _plan_next_hint(job_id):
@@ -47,7 +97,21 @@ def _plan_next_hint(job_id):
 # subcommands
 
 
+def _follow(client, job, events=None, st=None):
+    """Stream progress for the job's current interaction, saving report text
+    to a partial file as it arrives."""
+    if st is None:
+        st = StreamState(job["current_interaction_id"])
+    st.partial_path = partial_path_for(job["job_id"])
+    print(f"partial:     {st.partial_path}", file=sys.stderr)
+    return follow(client, st, events)
+
+
 def cmd_start(args):
+    if args.stream and args.no_wait:
+        print("error: --stream cannot be combined with --no-wait", file=sys.stderr)
+        sys.exit(1)
+
     client = make_client()
     model = AGENT_MODELS["max" if args.max else "default"]
 
@@ -59,8 +123,12 @@ def cmd_start(args):
             "collaborative_planning": True,
         }
 
-    interaction = interactions_create(client, **kwargs)
-    iid = new_interaction_id(interaction)
+    streamed = stream_create(client, **kwargs) if args.stream else None
+    if streamed:
+        events, st = streamed
+        iid = st.interaction_id
+    else:
+        iid = new_interaction_id(interactions_create(client, **kwargs))
 
     job = new_job(
         query=args.query,
@@ -79,24 +147,22 @@ def cmd_start(args):
         print(f"\nresume with: gski deepresearch wait {job['job_id']}")
         return
 
-    result = poll(client, iid)
+    if streamed:
+        result = _follow(client, job, events, st)
+    else:
+        result = poll(client, iid)
     text = extract_text(result)
 
     if args.plan:
-        save_job(job)
         print("\n--- plan ---\n")
         print(text)
         _plan_next_hint(job["job_id"])
     else:
-        job["state"] = "completed"
-        save_job(job)
-        _write_report(job, text, args.output)
+        _finish(job, text, args.output)
 
 
 def cmd_list(args):
-    jobs = all_jobs()
-    if not args.all:
-        jobs = [j for j in jobs if j.get("state") not in ("completed", "failed")]
+    jobs = all_jobs() if args.all else all_jobs(exclude=("completed", "failed"))
 
     if not jobs:
         print("(no jobs)")
@@ -125,7 +191,80 @@ def cmd_status(args):
         print(f"report:      {job['report_path']}")
 
 
+# polling errors (network, 5xx) tolerated per job in `wait --all`
+WAIT_RETRIES = 3
+WAIT_RETRY_DELAY = 10
+
+
+async def _poll_retrying(client, job):
+    for attempt in range(WAIT_RETRIES + 1):
+        try:
+            return await apoll(client, job["current_interaction_id"], job["job_id"])
+        except Exception as e:
+            if attempt == WAIT_RETRIES:
+                print(
+                    f"error: job {job['job_id']}: polling failed: {e}", file=sys.stderr
+                )
+                return None
+            delay = WAIT_RETRY_DELAY * (attempt + 1)
+            print(
+                f"  ! job {job['job_id']}: polling failed ({e}); "
+                f"retrying in {delay}s",
+                file=sys.stderr,
+            )
+            await asyncio.sleep(delay)
+
+
+async def _collect(client, job):
+    """Wait for one job of `wait --all`. Errors stay with the job: it counts
+    as failed and the other jobs carry on."""
+    interaction = await _poll_retrying(client, job)
+    if interaction is None:
+        return False
+    if getattr(interaction, "status", None) == "failed":
+        err = getattr(interaction, "error", "unknown error")
+        print(f"error: job {job['job_id']} failed: {err}", file=sys.stderr)
+        await asyncio.to_thread(_fail, job)
+        return False
+
+    # resolving links and writing the report is blocking I/O
+    try:
+        await asyncio.to_thread(_finish, job, extract_text(interaction), None)
+    except Exception as e:
+        print(f"error: job {job['job_id']}: saving report failed: {e}", file=sys.stderr)
+        return False
+    return True
+
+
+async def _wait_all(jobs):
+    client = new_gemini_client()
+    try:
+        done = await asyncio.gather(*(_collect(client, j) for j in jobs))
+    finally:
+        await client.aio.aclose()
+    return done.count(False)
+
+
 def cmd_wait(args):
+    if args.all:
+        if args.id or args.output or args.stream:
+            print("error: --all takes no job id, --output or --stream", file=sys.stderr)
+            sys.exit(1)
+        make_client()
+        jobs = all_jobs(states=("running",))
+        if not jobs:
+            print("(no running jobs)")
+            return
+        print(f"waiting for {len(jobs)} job(s)...", file=sys.stderr)
+        failed = asyncio.run(_wait_all(jobs))
+        print(f"{len(jobs) - failed}/{len(jobs)} job(s) completed", file=sys.stderr)
+        if failed:
+            sys.exit(2)
+        return
+
+    if not args.id:
+        print("error: job id required (or use --all)", file=sys.stderr)
+        sys.exit(1)
     job = load_job(args.id)
 
     if job["state"] == "completed":
@@ -133,19 +272,19 @@ def cmd_wait(args):
         return
 
     client = make_client()
-    result = poll(client, job["current_interaction_id"])
+    if args.stream:
+        result = _follow(client, job)
+    else:
+        result = poll(client, job["current_interaction_id"])
     text = extract_text(result)
 
     if job["mode"] == "plan" and job["state"] == "planning":
-        save_job(job)
         print("\n--- plan ---\n")
         print(text)
         _plan_next_hint(job["job_id"])
         return
 
-    job["state"] = "completed"
-    save_job(job)
-    _write_report(job, text, args.output)
+    _finish(job, text, args.output)
 
 
 def cmd_show(args):
@@ -157,63 +296,63 @@ def cmd_show(args):
     sys.stdout.write(Path(rp).read_text())
 
 
-def cmd_refine(args):
-    job = load_job(args.id)
+def _check_planning(job, action):
     if job["mode"] != "plan":
         print("error: job is not in planning mode", file=sys.stderr)
         sys.exit(1)
     if job["state"] != "planning":
         print(
-            f"error: cannot refine job in state '{job['state']}'", file=sys.stderr
+            f"error: cannot {action} job in state '{job['state']}'", file=sys.stderr
         )
         sys.exit(1)
 
-    client = make_client()
-    interaction = interactions_create(
-        client,
-        agent=job["model"],
-        input=args.feedback,
-        agent_config={"type": "deep-research", "collaborative_planning": True},
-        previous_interaction_id=job["current_interaction_id"],
-        background=True,
-    )
-    iid = new_interaction_id(interaction)
-    record_interaction(job, iid, "refine", args.feedback)
-    save_job(job)
+
+def cmd_refine(args):
+    job_id = load_job(args.id)["job_id"]
+    # held until the new interaction is recorded, so two refines/approves
+    # can't both chain off the same plan
+    with job_lock(job_id):
+        job = load_job(job_id)
+        _check_planning(job, "refine")
+        client = make_client()
+        interaction = interactions_create(
+            client,
+            agent=job["model"],
+            input=args.feedback,
+            agent_config={"type": "deep-research", "collaborative_planning": True},
+            previous_interaction_id=job["current_interaction_id"],
+            background=True,
+        )
+        iid = new_interaction_id(interaction)
+        record_interaction(job, iid, "refine", args.feedback)
+        save_job(job)
     print(f"refining (interaction {iid})...")
 
     result = poll(client, iid)
     text = extract_text(result)
-    save_job(job)
     print("\n--- plan ---\n")
     print(text)
     _plan_next_hint(job["job_id"])
 
 
 def cmd_approve(args):
-    job = load_job(args.id)
-    if job["mode"] != "plan":
-        print("error: job is not in planning mode", file=sys.stderr)
-        sys.exit(1)
-    if job["state"] != "planning":
-        print(
-            f"error: cannot approve job in state '{job['state']}'", file=sys.stderr
+    job_id = load_job(args.id)["job_id"]
+    with job_lock(job_id):
+        job = load_job(job_id)
+        _check_planning(job, "approve")
+        client = make_client()
+        interaction = interactions_create(
+            client,
+            agent=job["model"],
+            input=args.message,
+            agent_config={"type": "deep-research", "collaborative_planning": False},
+            previous_interaction_id=job["current_interaction_id"],
+            background=True,
         )
-        sys.exit(1)
-
-    client = make_client()
-    interaction = interactions_create(
-        client,
-        agent=job["model"],
-        input=args.message,
-        agent_config={"type": "deep-research", "collaborative_planning": False},
-        previous_interaction_id=job["current_interaction_id"],
-        background=True,
-    )
-    iid = new_interaction_id(interaction)
-    record_interaction(job, iid, "execute", args.message)
-    job["state"] = "running"
-    save_job(job)
+        iid = new_interaction_id(interaction)
+        record_interaction(job, iid, "execute", args.message)
+        job["state"] = "running"
+        save_job(job)
     print(f"job:         {job['job_id']}")
     print(f"interaction: {iid}")
     print("state:       running")
@@ -224,9 +363,7 @@ def cmd_approve(args):
 
     result = poll(client, iid)
     text = extract_text(result)
-    job["state"] = "completed"
-    save_job(job)
-    _write_report(job, text, args.output)
+    _finish(job, text, args.output)
 
 
 def cmd_rm(args):
@@ -250,6 +387,123 @@ def cmd_resolve(args):
     print(f"wrote {dst}")
 
 
+# ---------------------------------------------------------------------------
+# daemon
+
+DAEMON_INTERVAL = 10
+# how long an interaction that errored while polling is left alone
+DAEMON_RETRY = 300
+
+
+def _event(name, job, **extra):
+    return {
+        "event": name,
+        "job_id": job["job_id"],
+        "interaction_id": job["current_interaction_id"],
+        "state": job["state"],
+        "query": job["query"],
+        "report_path": job.get("report_path"),
+        "time": now_iso(),
+        **extra,
+    }
+
+
+async def _track(client, job, hook):
+    """Poll one interaction to the end, record the outcome and emit its
+    event. Nothing is emitted if another process got there first."""
+    iid = job["current_interaction_id"]
+    interaction = await apoll(client, iid, job["job_id"])
+
+    if getattr(interaction, "status", None) == "failed":
+        err = str(getattr(interaction, "error", "unknown error"))
+        print(f"error: job {job['job_id']} failed: {err}", file=sys.stderr)
+        if not await asyncio.to_thread(_fail, job):
+            return
+        event = _event("failed", job, error=err)
+    elif job["state"] == "planning":
+        text = extract_text(interaction)
+
+        def mark(current):
+            if current["current_interaction_id"] != iid:
+                return False
+            current["plan_ready"] = iid
+
+        try:
+            if not await asyncio.to_thread(update_job, job, mark):
+                return
+        except JobConflict as e:
+            print(f"  ! {e}; skipped", file=sys.stderr)
+            return
+        event = _event("plan_ready", job, plan=text)
+    else:
+        text = extract_text(interaction)
+        if not await asyncio.to_thread(_finish, job, text, None):
+            return
+        event = _event("completed", job)
+
+    await asyncio.to_thread(hook.emit, event)
+
+
+def _pending(job):
+    iid = job.get("current_interaction_id")
+    if not iid or (job["state"] == "planning" and job.get("plan_ready") == iid):
+        return None
+    return iid
+
+
+async def _daemon(args, hook):
+    # one client (and connection pool) for every job
+    client = new_gemini_client()
+    tasks = {}
+    retry_at = {}
+    try:
+        while True:
+            for iid, task in list(tasks.items()):
+                if not task.done():
+                    continue
+                del tasks[iid]
+                if not task.cancelled() and task.exception():
+                    err = task.exception()
+                    print(f"  ! polling {iid} failed: {err}", file=sys.stderr)
+                    retry_at[iid] = time.monotonic() + DAEMON_RETRY
+
+            jobs = await asyncio.to_thread(all_jobs, states=("running", "planning"))
+            for job in jobs:
+                iid = _pending(job)
+                if not iid or iid in tasks or retry_at.get(iid, 0) > time.monotonic():
+                    continue
+                retry_at.pop(iid, None)
+                tasks[iid] = asyncio.create_task(_track(client, job, hook))
+
+            if args.exit_when_idle and not tasks:
+                return
+            await asyncio.sleep(args.interval)
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        await client.aio.aclose()
+
+
+def cmd_daemon(args):
+    make_client()
+    lock = daemon_lock()
+    if lock is None:
+        print("error: a deepresearch daemon is already running", file=sys.stderr)
+        sys.exit(1)
+    hook = Hook(args.hook, args.fifo)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(
+        f"watching jobs (every {args.interval:g}s); Ctrl-C to stop", file=sys.stderr
+    )
+    try:
+        asyncio.run(_daemon(args, hook))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        lock.close()
+
+
 # ---------------------------------------------------------------------------
 
 
@@ -288,6 +542,12 @@ def register(subparsers):
         action="store_true",
         help="return immediately after kicking off; poll later with `wait`",
     )
+    start.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream live progress (thought summaries, partial report) "
+        "instead of polling",
+    )
     start.set_defaults(func=cmd_start)
 
     lst = sp.add_parser("list", help="list tracked jobs")
@@ -299,8 +559,19 @@ def register(subparsers):
     stat.set_defaults(func=cmd_status)
 
     wait = sp.add_parser("wait", help="resume polling until job completes")
-    wait.add_argument("id", help="job id (prefix ok)")
+    wait.add_argument("id", nargs="?", help="job id (prefix ok)")
+    wait.add_argument(
+        "--all",
+        "-a",
+        action="store_true",
+        help="wait for every running job at once, saving each report as it lands",
+    )
     wait.add_argument("--output", "-o", help="write final report to this path")
+    wait.add_argument(
+        "--stream",
+        action="store_true",
+        help="stream live progress instead of polling",
+    )
     wait.set_defaults(func=cmd_wait)
 
     show = sp.add_parser("show", help="print saved report to stdout")
@@ -342,3 +613,28 @@ def register(subparsers):
         "--output", "-o", help="output path (default: <stem>_resolved_links.md)"
     )
     res.set_defaults(func=cmd_resolve)
+
+    dmn = sp.add_parser(
+        "daemon",
+        help="collect running jobs in the background and emit completion events",
+    )
+    dmn.add_argument(
+        "--hook",
+        metavar="CMD",
+        help="shell command run per event, with the event JSON on stdin",
+    )
+    dmn.add_argument(
+        "--fifo", metavar="PATH", help="write events as JSON lines to this FIFO"
+    )
+    dmn.add_argument(
+        "--interval",
+        type=float,
+        default=DAEMON_INTERVAL,
+        help=f"seconds between job store scans (default: {DAEMON_INTERVAL})",
+    )
+    dmn.add_argument(
+        "--exit-when-idle",
+        action="store_true",
+        help="exit once no job is left to collect",
+    )
+    dmn.set_defaults(func=cmd_daemon)
@@ -1,5 +1,6 @@
+import asyncio
 import mimetypes
-import os
+import random
 import re
 import sys
 import time
@@ -10,18 +11,12 @@ warnings.filterwarnings(
     "ignore", message=r".*Interactions usage is experimental.*"
 )
 
-from google import genai
-
 from ..models import GEMINI_DEEP_RESEARCH as AGENT_MODELS
 
-POLL_INTERVAL = 10
-
-
-def make_client():
-    if not os.environ.get("GEMINI_API_KEY"):
-        print("error: GEMINI_API_KEY env var required", file=sys.stderr)
-        sys.exit(1)
-    return genai.Client()
+# first check soon after submitting, then back off to POLL_MAX
+POLL_MIN = 2
+POLL_MAX = 30
+POLL_BACKOFF = 1.5
 
 
 def _interactions(client):
@@ -132,9 +127,19 @@ def extract_text(interaction):
     return getattr(interaction, "text", "") or ""
 
 
-def poll(client, interaction_id, interval=POLL_INTERVAL):
+def poll_delays(first=POLL_MIN, cap=POLL_MAX):
+    """Seconds to sleep between status checks: exponential backoff with
+    +/-20% jitter so many jobs polled together don't stay in lockstep."""
+    delay = first
+    while True:
+        yield random.uniform(delay * 0.8, delay * 1.2)
+        delay = min(cap, delay * POLL_BACKOFF)
+
+
+def poll(client, interaction_id):
     start = time.time()
     last_status = None
+    delays = poll_delays()
     while True:
         interaction = interactions_get(client, interaction_id)
         status = getattr(interaction, "status", None)
@@ -148,7 +153,131 @@ def poll(client, interaction_id, interval=POLL_INTERVAL):
             err = getattr(interaction, "error", "unknown error")
             print(f"error: research failed: {err}", file=sys.stderr)
             sys.exit(2)
-        time.sleep(interval)
+        time.sleep(next(delays))
+
+
+async def apoll(client, interaction_id, label):
+    """Async `poll` on an aio-capable client. Returns the final interaction,
+    completed or failed, and leaves handling a failure to the caller."""
+    api = client.aio.interactions
+    start = time.time()
+    last_status = None
+    delays = poll_delays()
+    while True:
+        interaction = await api.get(interaction_id)
+        status = getattr(interaction, "status", None)
+        if status != last_status:
+            elapsed = int(time.time() - start)
+            print(f"[{label} {elapsed}s] {status}", file=sys.stderr)
+            last_status = status
+        if status in ("completed", "failed"):
+            return interaction
+        await asyncio.sleep(next(delays))
+
+
+# ---------------------------------------------------------------------------
+# streaming
+
+
+class StreamState:
+    def __init__(self, interaction_id=None, partial_path=None):
+        self.interaction_id = interaction_id
+        self.last_event_id = None
+        self.done = False
+        self.partial_path = partial_path
+        self.start = time.time()
+
+
+def _log(st, msg):
+    print(f"[{int(time.time() - st.start)}s] {msg}", file=sys.stderr)
+
+
+def consume(events, st, until_created=False):
+    """Handle interaction stream events: thought summaries and status changes
+    go to stderr, report text is appended to `st.partial_path` as it
+    arrives. With `until_created`, returns once the interaction id is known
+    so the caller can record the job before the rest of the stream."""
+    for event in events:
+        kind = getattr(event, "event_type", None)
+        if getattr(event, "event_id", None):
+            st.last_event_id = event.event_id
+
+        if kind == "interaction.created":
+            st.interaction_id = event.interaction.id
+            if until_created:
+                return
+        elif kind == "interaction.status_update":
+            _log(st, event.status)
+        elif kind == "step.delta":
+            delta = event.delta
+            dtype = getattr(delta, "type", None)
+            if dtype == "text" and st.partial_path:
+                with open(st.partial_path, "a") as f:
+                    f.write(delta.text)
+            elif dtype in ("thought", "thought_summary"):
+                text = getattr(delta, "text", None) or _part_text(
+                    getattr(delta, "content", None)
+                )
+                if text:
+                    _log(st, f"thinking: {text.strip()}")
+        elif kind in ("interaction.completed", "error"):
+            if kind == "error":
+                _log(st, f"stream error: {getattr(event, 'error', None)}")
+            st.done = True
+            return
+
+
+def stream_create(client, **kwargs):
+    """Start an interaction in streaming mode. Returns (events, state), or
+    None if this API/SDK can't stream, in which case nothing was created."""
+    kwargs["agent_config"] = {
+        "type": "deep-research",
+        **(kwargs.get("agent_config") or {}),
+        "thinking_summaries": "auto",
+    }
+    try:
+        events = iter(interactions_create(client, stream=True, **kwargs))
+    except TypeError as e:
+        print(f"  ! streaming unavailable ({e}); polling instead", file=sys.stderr)
+        return None
+    st = StreamState()
+    consume(events, st, until_created=True)
+    if not st.interaction_id:
+        print("error: stream ended before the interaction was created", file=sys.stderr)
+        sys.exit(1)
+    return events, st
+
+
+def follow(client, st, events=None):
+    """Stream an interaction to completion, reconnecting from the last seen
+    event when the connection drops. Same result contract as `poll`; falls
+    back to it if the stream can't be opened."""
+    import httpx
+    from google.genai import errors
+
+    api = _interactions(client)
+    while not st.done:
+        try:
+            if events is None:
+                kwargs = {"stream": True}
+                if st.last_event_id:
+                    kwargs["last_event_id"] = st.last_event_id
+                events = api.get(st.interaction_id, **kwargs)
+            consume(events, st)
+        except TypeError as e:
+            print(f"  ! streaming unavailable ({e}); polling instead", file=sys.stderr)
+            return poll(client, st.interaction_id)
+        except (errors.APIError, httpx.HTTPError, OSError) as e:
+            _log(st, f"stream dropped ({e}); reconnecting")
+        events = None
+        if st.done:
+            break
+        status = getattr(interactions_get(client, st.interaction_id), "status", None)
+        if status in ("completed", "failed"):
+            break
+
+    # the stream carries deltas; the stored interaction has the full report
+    return poll(client, st.interaction_id)
 
 
 def new_interaction_id(interaction):
@@ -0,0 +1,75 @@
+"""Completion events from `gski deepresearch daemon`.
+
+Each event is one JSON object. A hook command gets it on stdin, with
+GSKI_EVENT / GSKI_JOB_ID / GSKI_REPORT set in its environment. A FIFO gets
+it as one line; with no reader attached the event is dropped rather than
+blocking the daemon.
+"""
+
+import errno
+import json
+import os
+import stat
+import subprocess
+import sys
+from pathlib import Path
+
+HOOK_TIMEOUT = 60
+
+
+class Hook:
+    def __init__(self, command=None, fifo=None):
+        self.command = command
+        self.fifo = Path(fifo) if fifo else None
+        if self.fifo:
+            if not self.fifo.exists():
+                os.mkfifo(self.fifo, 0o600)
+            elif not stat.S_ISFIFO(self.fifo.stat().st_mode):
+                print(f"error: {self.fifo} exists and is not a FIFO", file=sys.stderr)
+                sys.exit(1)
+
+    def emit(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        print(f"event: {event['event']} {event['job_id']}", file=sys.stderr)
+        if self.command:
+            self._run(event, line)
+        if self.fifo:
+            self._write_fifo(line)
+
+    def _run(self, event, line):
+        env = {
+            **os.environ,
+            "GSKI_EVENT": event["event"],
+            "GSKI_JOB_ID": event["job_id"],
+            "GSKI_REPORT": event.get("report_path") or "",
+        }
+        try:
+            r = subprocess.run(
+                self.command,
+                shell=True,
+                input=line + "\n",
+                text=True,
+                env=env,
+                timeout=HOOK_TIMEOUT,
+            )
+        except subprocess.TimeoutExpired:
+            print(f"  ! hook timed out after {HOOK_TIMEOUT}s", file=sys.stderr)
+            return
+        if r.returncode:
+            print(f"  ! hook exited with {r.returncode}", file=sys.stderr)
+
+    def _write_fifo(self, line):
+        try:
+            fd = os.open(self.fifo, os.O_WRONLY | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno == errno.ENXIO:
+                print(f"  ! no reader on {self.fifo}; event dropped", file=sys.stderr)
+                return
+            raise
+        try:
+            os.set_blocking(fd, True)
+            os.write(fd, (line + "\n").encode())
+        except BrokenPipeError:
+            print(f"  ! {self.fifo} reader went away; event dropped", file=sys.stderr)
+        finally:
+            os.close(fd)
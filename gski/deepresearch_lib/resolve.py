@@ -3,25 +3,41 @@ import ssl
 import sys
 import urllib.error
 import urllib.request
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ..redirects import cache_get, cache_put
 
 REDIRECT_RE = re.compile(
     r"https://vertexaisearch\.cloud\.google\.com/grounding-api-redirect/[^\s\)]+"
 )
 
+RESOLVE_WORKERS = 16
+
 _SSL_CTX = ssl.create_default_context()
 _SSL_CTX.check_hostname = False
 _SSL_CTX.verify_mode = ssl.CERT_NONE
 
 
 def resolve_url(url, timeout=10):
+    cached = cache_get([url])
+    if url in cached:
+        return cached[url] or url
+    return _fetch(url, timeout)
+
+
+def _fetch(url, timeout=10):
+    """Follow `url` over the network and cache the outcome."""
     req = urllib.request.Request(url, headers={"User-Agent": "Mozilla/5.0"})
     try:
         with urllib.request.urlopen(req, timeout=timeout, context=_SSL_CTX) as r:
+            cache_put({url: r.url})
             return r.url
     except urllib.error.HTTPError as e:
         # redirects were followed; final page may 4xx/5xx but e.url is the real target
         if e.url and e.url != url:
+            cache_put({url: e.url})
             return e.url
+        cache_put({url: None})
         print(f"  ! failed: {url[:80]}... ({e})", file=sys.stderr)
         return url
     except Exception as e:
@@ -30,17 +46,33 @@ def resolve_url(url, timeout=10):
 
 
 def resolve_text(text, verbose=True):
+    """Replace every redirect link in `text` with its target. Links are
+    resolved on a thread pool and substituted in one regex pass."""
     urls = list(dict.fromkeys(REDIRECT_RE.findall(text)))
     if not urls:
         return text
+
+    # negative hits are final too: they stay unresolved without a lookup
+    cached = cache_get(urls)
+    targets = {u: t for u, t in cached.items() if t}
+    todo = [u for u in urls if u not in cached]
     if verbose:
-        print(f"resolving {len(urls)} redirect link(s)...", file=sys.stderr)
-    for i, u in enumerate(urls, 1):
-        real = resolve_url(u)
-        if real and real != u:
-            text = text.replace(u, real)
-            if verbose:
-                print(f"  [{i}/{len(urls)}] {real}", file=sys.stderr)
-        elif verbose:
-            print(f"  [{i}/{len(urls)}] (unchanged)", file=sys.stderr)
-    return text
+        print(
+            f"resolving {len(urls)} redirect link(s) ({len(urls) - len(todo)} cached)...",
+            file=sys.stderr,
+        )
+
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(RESOLVE_WORKERS, len(todo))) as pool:
+            futures = {pool.submit(_fetch, u): u for u in todo}
+            for i, future in enumerate(as_completed(futures), 1):
+                u = futures[future]
+                real = future.result()
+                if real and real != u:
+                    targets[u] = real
+                    if verbose:
+                        print(f"  [{i}/{len(todo)}] {real}", file=sys.stderr)
+                elif verbose:
+                    print(f"  [{i}/{len(todo)}] (unchanged)", file=sys.stderr)
+
+    return REDIRECT_RE.sub(lambda m: targets.get(m.group(0), m.group(0)), text)
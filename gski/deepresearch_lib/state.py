@@ -1,16 +1,46 @@
+"""Local deepresearch job state.
+
+Jobs live in an indexed sqlite store ($XDG_STATE_HOME/gski/deepresearch/
+jobs.sqlite) so listing, filtering by state and id-prefix lookups don't
+have to read every job. Reports are plain markdown files next to it. Job
+files from the old one-JSON-file-per-job layout are imported once, the
+first time the store is opened.
+
+Several processes (wait, approve, the collector daemon) may work on the same
+job. Each row carries a version: `save_job` only writes if the row is still
+at the version the job was loaded at, and raises JobConflict otherwise.
+Read-modify-write sequences hold the job's advisory lock (`job_lock`) and
+go through `update_job`, which reloads the current copy first.
+"""
+
+import fcntl
 import json
-import os
 import secrets
+import sqlite3
 import sys
+from contextlib import contextmanager
 from datetime import datetime, timezone
-from pathlib import Path
 
+from ..paths import STATE_DIR as GSKI_STATE_DIR
+from ..paths import write_atomic
 
-STATE_DIR = (
-    Path(os.environ.get("XDG_STATE_HOME", str(Path.home() / ".local" / "state")))
-    / "gski"
-    / "deepresearch"
-)
+STATE_DIR = GSKI_STATE_DIR / "deepresearch"
+DB_PATH = STATE_DIR / "jobs.sqlite"
+LOCK_DIR = STATE_DIR / "locks"
+
+SCHEMA_VERSION = 1
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id     TEXT PRIMARY KEY,
+    state      TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    data       TEXT NOT NULL,
+    version    INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, updated_at);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated_at);
+"""
 
 
 def now_iso():
@@ -25,51 +55,214 @@ def new_job_id():
     return secrets.token_hex(4)
 
 
-def job_path(job_id):
-    return STATE_DIR / f"{job_id}.json"
-
-
 def report_path_for(job_id):
     return STATE_DIR / f"{job_id}.md"
 
 
-def resolve_job_id(prefix):
+def partial_path_for(job_id):
+    return STATE_DIR / f"{job_id}.partial.md"
+
+
+class JobConflict(Exception):
+    """The job was changed by another process since it was loaded."""
+
+
+# ---------------------------------------------------------------------------
+# store
+
+
+def _write(db, job):
+    data = {k: v for k, v in job.items() if k != "version"}
+    db.execute(
+        "INSERT OR REPLACE INTO jobs "
+        "(job_id, state, created_at, updated_at, data, version) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        (
+            job["job_id"],
+            job.get("state") or "unknown",
+            job.get("created_at") or "",
+            job.get("updated_at") or "",
+            json.dumps(data),
+            job.get("version") or 0,
+        ),
+    )
+
+
+def _migrate(db):
+    """Import jobs from the old <job_id>.json files. The files are left in
+    place; the store is authoritative from here on."""
+    imported = 0
+    for p in sorted(STATE_DIR.glob("*.json")):
+        try:
+            job = json.loads(p.read_text())
+            job.setdefault("job_id", p.stem)
+        except (OSError, ValueError) as e:
+            print(f"  ! skipping unreadable job file {p}: {e}", file=sys.stderr)
+            continue
+        _write(db, job)
+        imported += 1
+    if imported:
+        print(f"imported {imported} job(s) into {DB_PATH}", file=sys.stderr)
+
+
+def connect():
     ensure_state_dir()
-    matches = sorted(p for p in STATE_DIR.glob("*.json") if p.stem.startswith(prefix))
+    db = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        db.execute("BEGIN IMMEDIATE")
+        # re-check under the write lock: another process may have migrated
+        if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # executescript would commit; keep DDL and import in one transaction
+            for stmt in filter(str.strip, SCHEMA.split(";")):
+                db.execute(stmt)
+            _migrate(db)
+            db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        db.execute("COMMIT")
+    return db
+
+
+@contextmanager
+def job_lock(job_id):
+    """Exclusive advisory lock on one job, across processes."""
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    with open(LOCK_DIR / f"{job_id}.lock", "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def daemon_lock():
+    """Lock held for the life of a `deepresearch daemon`; None if another
+    daemon already has it."""
+    LOCK_DIR.mkdir(parents=True, exist_ok=True)
+    f = open(LOCK_DIR / "daemon.lock", "w")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def resolve_job_id(prefix):
+    db = connect()
+    try:
+        # range scan on the primary key: ids are lowercase hex
+        matches = [
+            r[0]
+            for r in db.execute(
+                "SELECT job_id FROM jobs WHERE job_id >= ? AND job_id < ? "
+                "ORDER BY job_id LIMIT 11",
+                (prefix, prefix + "\uffff"),
+            )
+        ]
+    finally:
+        db.close()
     if not matches:
         print(f"error: no job matching '{prefix}'", file=sys.stderr)
         sys.exit(1)
     if len(matches) > 1:
-        ids = ", ".join(p.stem for p in matches)
+        ids = ", ".join(matches[:10]) + (", ..." if len(matches) > 10 else "")
         print(f"error: ambiguous job id '{prefix}' matches: {ids}", file=sys.stderr)
         sys.exit(1)
-    return matches[0].stem
+    return matches[0]
+
+
+def _load(job_id):
+    db = connect()
+    try:
+        row = db.execute(
+            "SELECT data, version FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        db.close()
+    if row is None:
+        raise JobConflict(f"job {job_id} was removed by another process")
+    job = json.loads(row[0])
+    job["version"] = row[1]
+    return job
 
 
 def load_job(prefix):
-    job_id = resolve_job_id(prefix)
-    return json.loads(job_path(job_id).read_text())
+    try:
+        return _load(resolve_job_id(prefix))
+    except JobConflict as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
 
 
 def save_job(job):
-    ensure_state_dir()
-    job["updated_at"] = now_iso()
-    job_path(job["job_id"]).write_text(json.dumps(job, indent=2))
+    """Write `job`, provided the stored copy is still the one it was loaded
+    from (or, for a new job, that there is none). Raises JobConflict
+    otherwise."""
+    expected = job.get("version")
+    db = connect()
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        row = db.execute(
+            "SELECT version FROM jobs WHERE job_id = ?", (job["job_id"],)
+        ).fetchone()
+        if (row and row[0]) != expected:
+            db.execute("ROLLBACK")
+            raise JobConflict(f"job {job['job_id']} was changed by another process")
+        job["updated_at"] = now_iso()
+        job["version"] = (expected or 0) + 1
+        _write(db, job)
+        db.execute("COMMIT")
+    finally:
+        db.close()
 
 
-def all_jobs():
-    ensure_state_dir()
+def update_job(job, change):
+    """Apply `change` to the current stored copy of `job` under its lock and
+    save it. `change` may return False to leave the job untouched, e.g. when
+    another process has already finished it. `job` is refreshed in place;
+    returns whether the change was saved. Raises JobConflict if the job was
+    removed, or written by a process that doesn't take the lock."""
+    with job_lock(job["job_id"]):
+        current = _load(job["job_id"])
+        saved = change(current) is not False
+        if saved:
+            save_job(current)
+    job.clear()
+    job.update(current)
+    return saved
+
+
+def all_jobs(states=None, exclude=None):
+    """Jobs, most recently updated first, optionally filtered by state."""
+    sql, params = "SELECT job_id, data, version FROM jobs", ()
+    if states:
+        sql += f" WHERE state IN ({','.join('?' * len(states))})"
+        params = tuple(states)
+    elif exclude:
+        sql += f" WHERE state NOT IN ({','.join('?' * len(exclude))})"
+        params = tuple(exclude)
+    sql += " ORDER BY updated_at DESC, job_id"
+    db = connect()
+    try:
+        rows = db.execute(sql, params).fetchall()
+    finally:
+        db.close()
     jobs = []
-    for p in sorted(
-        STATE_DIR.glob("*.json"), key=lambda x: x.stat().st_mtime, reverse=True
-    ):
+    for job_id, data, version in rows:
         try:
-            jobs.append(json.loads(p.read_text()))
-        except Exception:
+            job = json.loads(data)
+        except ValueError as e:
+            print(f"  ! job {job_id} has unreadable state: {e}", file=sys.stderr)
             continue
+        job["version"] = version
+        jobs.append(job)
     return jobs
 
 
+# ---------------------------------------------------------------------------
+# jobs
+
+
 def new_job(query, model, mode, files):
     job_id = new_job_id()
     ts = now_iso()
@@ -102,15 +295,27 @@ def record_interaction(job, interaction_id, kind, user_input):
 
 def save_report(job, text):
     path = report_path_for(job["job_id"])
-    path.write_text(text)
+    write_atomic(path, text)
     job["report_path"] = str(path)
+    partial_path_for(job["job_id"]).unlink(missing_ok=True)
     return path
 
 
 def remove_job(job, keep_report=False):
-    jp = job_path(job["job_id"])
+    with job_lock(job["job_id"]):
+        db = connect()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM jobs WHERE job_id = ?", (job["job_id"],))
+            db.execute("COMMIT")
+        finally:
+            db.close()
+    # the lock file is left in place: unlinking it would let a process still
+    # waiting on the old inode and one that opens a new file both hold it
+
+    # the pre-sqlite file, so it isn't imported again by a fresh store
+    (STATE_DIR / f"{job['job_id']}.json").unlink(missing_ok=True)
     rp = report_path_for(job["job_id"])
-    if jp.exists():
-        jp.unlink()
     if rp.exists() and not keep_report:
         rp.unlink()
+    partial_path_for(job["job_id"]).unlink(missing_ok=True)
@@ -6,6 +6,7 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+from .clients import openai_client
 from .models import OPENAI_IMAGE as MODELS
 
 POPULAR_SIZES = [
@@ -146,7 +147,7 @@ def run(args):
         sys.exit(1)
 
     try:
-        from openai import OpenAI
+        import openai  # noqa: F401
     except ImportError:
         print(
             "error: openai is required; install with 'pip install openai'",
@@ -154,7 +155,7 @@ def run(args):
         )
         sys.exit(1)
 
-    client = OpenAI()
+    client = openai_client()
 
     api_format = {"jpg": "jpeg", "png": "png", "webp": "webp"}[args.format]
 
@@ -0,0 +1,52 @@
+"""Concurrent JSONL batches, shared by `llm-process --batch` and
+`websearch --batch`: read the batch file, run each item against the Gemini
+API a few at a time and print one JSON record per item."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+from .clients import new_gemini_client
+
+
+def read_lines(path):
+    """(line number, text) for each non-blank line of `path`, or of stdin
+    for "-"."""
+    if path == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        p = Path(path)
+        if not p.exists():
+            print(f"error: batch file not found: {path}", file=sys.stderr)
+            sys.exit(1)
+        lines = p.read_text().splitlines()
+    return [(n, line.strip()) for n, line in enumerate(lines, 1) if line.strip()]
+
+
+async def run(args, items, run_one, noun="job(s)"):
+    """Await `run_one(client, sem, args, item, index)` for every item, at
+    most args.concurrency at a time, and print the records it returns in
+    input order (--ordered) or as they finish. Returns how many records
+    carry an "error"."""
+    # aio connection pools are bound to the event loop that opened them, so
+    # each batch gets its own client rather than the process-wide one.
+    client = new_gemini_client()
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+    tasks = [
+        asyncio.create_task(run_one(client, sem, args, item, i))
+        for i, item in enumerate(items)
+    ]
+    pending = tasks if args.ordered else asyncio.as_completed(tasks)
+
+    failed = 0
+    try:
+        for next_result in pending:
+            record = await next_result
+            failed += "error" in record
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+    finally:
+        await client.aio.aclose()
+
+    print(f"{len(items) - failed}/{len(items)} {noun} succeeded", file=sys.stderr)
+    return failed
@@ -0,0 +1,101 @@
+import json
+
+
+class ArrayItems:
+    """Incremental splitter for a streamed JSON document. When the top-level
+    value is an array, each element is returned by `feed` as soon as it is
+    complete, and only the element in progress is buffered. Any other
+    top-level value is buffered whole and returned by `close`.
+
+    A malformed element doesn't raise from `feed`: parsing stops, `error`
+    is set, and `rest` returns the raw text from that element on so the
+    caller can still pass it through."""
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_str = False
+        self._escape = False
+        self.mode = None  # "array" once a leading "[" is seen, else "other"
+        self.done = False
+        self.error = None
+
+    def _take(self, items, text):
+        """Parse one element into `items`; on failure record the error and
+        return False, leaving the element at the front of the buffer."""
+        text = text.strip()
+        try:
+            if text:
+                items.append(json.loads(text))
+        except ValueError as e:
+            self.error = e
+            return False
+        return True
+
+    def rest(self):
+        """Raw text buffered but not returned as an item."""
+        return self._buf
+
+    def feed(self, text):
+        if self.error is not None:
+            self._buf += text
+            return []
+        if self.done:
+            return []
+        self._buf += text
+        if self.mode is None:
+            stripped = self._buf.lstrip()
+            if not stripped:
+                return []
+            if stripped[0] != "[":
+                self.mode = "other"
+                return []
+            self.mode = "array"
+            self._buf = stripped[1:]
+            self._depth = 1
+        if self.mode != "array":
+            return []
+
+        items = []
+        buf, i = self._buf, self._pos
+        while i < len(buf):
+            c = buf[i]
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_str = False
+            elif c == '"':
+                self._in_str = True
+            elif c in "[{":
+                self._depth += 1
+            elif c in "]}":
+                self._depth -= 1
+                if self._depth == 0:
+                    if not self._take(items, buf[:i]):
+                        break
+                    self.done = True
+                    buf, i = "", 0
+                    break
+            elif c == "," and self._depth == 1:
+                if not self._take(items, buf[:i]):
+                    break
+                buf, i = buf[i + 1 :], 0
+                continue
+            i += 1
+        self._buf, self._pos = buf, i
+        return items
+
+    def close(self):
+        """The whole document when it wasn't an array; raises ValueError if
+        it doesn't parse or an array was cut off."""
+        if self.error is not None:
+            raise ValueError(str(self.error))
+        if self.mode == "array":
+            if not self.done:
+                raise ValueError("truncated JSON array")
+            return None
+        return json.loads(self._buf) if self._buf.strip() else None
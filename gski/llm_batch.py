@@ -0,0 +1,374 @@
+"""`gski llm-process batch`: offline workloads through the Gemini Batch API.
+
+Jobs use the same JSONL format as `llm-process --batch`. They are submitted
+as one batch per model, and results are fetched later in the same JSONL
+shape that `--batch` prints. Local job state lives in
+$XDG_STATE_HOME/gski/llm-batch.
+"""
+
+import json
+import secrets
+import sys
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from google.genai import types
+
+from .clients import make_client
+from .llm_process import (
+    MODELS,
+    build_contents,
+    expand_files,
+    job_args,
+    load_schema,
+    read_jobs,
+)
+from .paths import STATE_DIR as GSKI_STATE_DIR
+from .paths import write_atomic
+
+STATE_DIR = GSKI_STATE_DIR / "llm-batch"
+
+TERMINAL = {
+    "JOB_STATE_SUCCEEDED",
+    "JOB_STATE_PARTIALLY_SUCCEEDED",
+    "JOB_STATE_FAILED",
+    "JOB_STATE_CANCELLED",
+    "JOB_STATE_EXPIRED",
+}
+DONE = {"JOB_STATE_SUCCEEDED", "JOB_STATE_PARTIALLY_SUCCEEDED"}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+# ---------------------------------------------------------------------------
+# local state
+
+
+def job_path(job_id):
+    return STATE_DIR / f"{job_id}.json"
+
+
+def resolve_job_id(prefix):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    matches = sorted(p for p in STATE_DIR.glob("*.json") if p.stem.startswith(prefix))
+    if not matches:
+        print(f"error: no batch matching '{prefix}'", file=sys.stderr)
+        sys.exit(1)
+    if len(matches) > 1:
+        ids = ", ".join(p.stem for p in matches)
+        print(f"error: ambiguous batch id '{prefix}' matches: {ids}", file=sys.stderr)
+        sys.exit(1)
+    return matches[0].stem
+
+
+def load_job(prefix):
+    return json.loads(job_path(resolve_job_id(prefix)).read_text())
+
+
+def save_job(job):
+    job["updated_at"] = now_iso()
+    write_atomic(job_path(job["job_id"]), json.dumps(job, indent=2))
+
+
+def all_jobs():
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    jobs = []
+    for p in sorted(
+        STATE_DIR.glob("*.json"), key=lambda x: x.stat().st_mtime, reverse=True
+    ):
+        try:
+            jobs.append(json.loads(p.read_text()))
+        except (OSError, ValueError) as e:
+            print(f"  ! skipping unreadable batch file {p}: {e}", file=sys.stderr)
+    return jobs
+
+
+def summary_state(job):
+    states = {b["state"] for b in job["batches"]}
+    if not states:
+        return "submitting"
+    if not states <= TERMINAL:
+        return "running"
+    if states <= DONE:
+        return "fetched" if job.get("fetched_at") else "succeeded"
+    return "failed"
+
+
+# ---------------------------------------------------------------------------
+# requests
+
+
+def to_request(client, jargs, prompt):
+    """A GenerateContentRequest as Batch API JSON. Binary files always go
+    through the Files API so the request file holds only text and URIs."""
+    parts = build_contents(
+        prompt, jargs.files, jargs.binary, None, client, upload=jargs.binary
+    )
+    content = types.Content(
+        role="user",
+        parts=[types.Part.from_text(text=p) if isinstance(p, str) else p for p in parts],
+    )
+    request = {"contents": [content.model_dump(mode="json", exclude_none=True)]}
+    if jargs.system:
+        request["system_instruction"] = {"parts": [{"text": jargs.system}]}
+    generation = {}
+    if jargs.json or jargs.schema:
+        generation["response_mime_type"] = "application/json"
+    if jargs.schema:
+        generation["response_json_schema"] = load_schema(jargs.schema)
+    if jargs.no_think:
+        generation["thinking_config"] = {"thinking_budget": 0}
+    if generation:
+        request["generation_config"] = generation
+    return request
+
+
+def check_jobs(args, jobs):
+    errors = []
+    for i, job in enumerate(jobs):
+        jargs = job_args(args, job)
+        label = job.get("id", i)
+        if jargs.model not in MODELS:
+            errors.append(f"job {label}: unknown model {jargs.model!r}")
+        for f in jargs.files:
+            if not Path(f).exists():
+                errors.append(f"job {label}: file not found: {f}")
+    if errors:
+        for e in errors:
+            print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def write_requests(client, args, jobs):
+    """One JSONL request file per model. Returns {model: (path, count)}."""
+    files = {}
+    handles = {}
+    try:
+        for i, job in enumerate(jobs):
+            jargs = job_args(args, job)
+            if jargs.model not in handles:
+                handles[jargs.model] = tempfile.NamedTemporaryFile(
+                    "w", prefix=f"gski-batch-{jargs.model}-", suffix=".jsonl", delete=False
+                )
+                files[jargs.model] = [Path(handles[jargs.model].name), 0]
+            line = {"key": str(i), "request": to_request(client, jargs, job["prompt"])}
+            handles[jargs.model].write(json.dumps(line, ensure_ascii=False) + "\n")
+            files[jargs.model][1] += 1
+    finally:
+        for f in handles.values():
+            f.close()
+    return {m: tuple(v) for m, v in files.items()}
+
+
+# ---------------------------------------------------------------------------
+# subcommands
+
+
+def cmd_submit(args):
+    client = make_client()
+    args.files, args.binary = expand_files(args.files)
+    jobs = read_jobs(args.jsonl)
+    if not jobs:
+        print("error: no jobs in input", file=sys.stderr)
+        sys.exit(1)
+    check_jobs(args, jobs)
+
+    job_id = secrets.token_hex(4)
+    job = {
+        "job_id": job_id,
+        "created_at": now_iso(),
+        "updated_at": now_iso(),
+        "source": args.jsonl,
+        "count": len(jobs),
+        "ids": {str(i): j["id"] for i, j in enumerate(jobs) if "id" in j},
+        "batches": [],
+        "fetched_at": None,
+    }
+
+    requests = write_requests(client, args, jobs)
+    try:
+        for name, (path, count) in sorted(requests.items()):
+            print(f"uploading {count} request(s) for {name}...", file=sys.stderr)
+            src = client.files.upload(
+                file=str(path),
+                config=types.UploadFileConfig(
+                    mime_type="jsonl", display_name=f"gski-{job_id}-{name}"
+                ),
+            )
+            batch = client.batches.create(
+                model=MODELS[name],
+                src=src.name,
+                config=types.CreateBatchJobConfig(display_name=f"gski-{job_id}-{name}"),
+            )
+            job["batches"].append(
+                {
+                    "name": batch.name,
+                    "model": MODELS[name],
+                    "count": count,
+                    "state": getattr(batch.state, "name", str(batch.state)),
+                }
+            )
+            save_job(job)
+    finally:
+        for path, _ in requests.values():
+            path.unlink(missing_ok=True)
+
+    print(f"batch:    {job_id}")
+    print(f"requests: {len(jobs)}")
+    for b in job["batches"]:
+        print(f"remote:   {b['name']} ({b['model']}, {b['count']})")
+    print(f"\ncheck with: gski llm-process batch status {job_id}")
+
+
+def refresh(client, job):
+    remote = []
+    for b in job["batches"]:
+        if b["state"] not in TERMINAL:
+            r = client.batches.get(name=b["name"])
+            b["state"] = getattr(r.state, "name", str(r.state))
+        else:
+            r = None
+        remote.append(r)
+    save_job(job)
+    return remote
+
+
+def cmd_status(args):
+    if not args.id:
+        jobs = all_jobs()
+        if not jobs:
+            print("(no batches)")
+            return
+        print(f"{'BATCH':<10}  {'STATE':<10}  {'REQS':>6}  {'CREATED':<25}  SOURCE")
+        for j in jobs:
+            print(
+                f"{j['job_id']:<10}  {summary_state(j):<10}  {j['count']:>6}  "
+                f"{j['created_at']:<25}  {j['source']}"
+            )
+        return
+
+    job = load_job(args.id)
+    refresh(make_client(), job)
+    print(f"batch:    {job['job_id']}")
+    print(f"state:    {summary_state(job)}")
+    print(f"requests: {job['count']}")
+    print(f"created:  {job['created_at']}")
+    for b in job["batches"]:
+        state = b["state"].removeprefix("JOB_STATE_").lower()
+        print(f"remote:   {b['name']} ({b['model']}, {b['count']}) {state}")
+
+
+def results(client, remote):
+    """(key, record) pairs from a finished remote batch."""
+    dest = remote.dest
+    if dest and dest.file_name:
+        data = client.files.download(file=dest.file_name)
+        for line in data.decode().splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            record = {}
+            if entry.get("response"):
+                response = types.GenerateContentResponse.model_validate(
+                    entry["response"]
+                )
+                record["text"] = response.text
+            else:
+                record["error"] = json.dumps(entry.get("error") or "no response")
+            yield entry.get("key"), record
+    elif dest and dest.inlined_responses:
+        for i, r in enumerate(dest.inlined_responses):
+            if r.response:
+                yield str(i), {"text": r.response.text}
+            else:
+                yield str(i), {"error": str(r.error)}
+
+
+def cmd_fetch(args):
+    job = load_job(args.id)
+    client = make_client()
+    remote = refresh(client, job)
+
+    pending = [b for b in job["batches"] if b["state"] not in TERMINAL]
+    if pending:
+        print(
+            f"error: batch {job['job_id']} still running "
+            f"({len(pending)}/{len(job['batches'])} remote job(s) not finished)",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+    records = {}
+    for b, r in zip(job["batches"], remote):
+        if b["state"] not in DONE:
+            print(f"  ! {b['name']} ended in {b['state']}", file=sys.stderr)
+            continue
+        r = r or client.batches.get(name=b["name"])
+        for key, record in results(client, r):
+            records[key] = record
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    failed = 0
+    try:
+        for i in range(job["count"]):
+            key = str(i)
+            record = {"index": i}
+            if key in job["ids"]:
+                record["id"] = job["ids"][key]
+            record.update(records.get(key, {"error": "no result"}))
+            failed += "error" in record
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    finally:
+        if args.output:
+            out.close()
+
+    job["fetched_at"] = now_iso()
+    save_job(job)
+    print(f"{job['count'] - failed}/{job['count']} job(s) succeeded", file=sys.stderr)
+    if args.output:
+        print(f"results written to {args.output}", file=sys.stderr)
+
+
+def register(subparsers):
+    sp = subparsers.add_parser(
+        "batch", help="run JSONL jobs through the Gemini Batch API"
+    ).add_subparsers(dest="action", required=True)
+
+    sub = sp.add_parser("submit", help="submit a JSONL job file")
+    sub.add_argument("jsonl", help="JSONL job file, one request per line ('-' for stdin)")
+    sub.add_argument(
+        "--file",
+        "-f",
+        action="append",
+        default=[],
+        dest="files",
+        help="input file, directory or glob added to every job (repeatable)",
+    )
+    sub.add_argument(
+        "--model",
+        "-m",
+        choices=list(MODELS.keys()),
+        default="flash",
+        help="default model for jobs without one (default: flash)",
+    )
+    sub.add_argument("--system", "-s", help="default system instruction")
+    sub.add_argument("--json", action="store_true", help="request JSON output")
+    sub.add_argument(
+        "--schema", metavar="FILE", help="default JSON Schema for responses"
+    )
+    sub.add_argument(
+        "--no-think", action="store_true", help="disable thinking / reasoning"
+    )
+    sub.set_defaults(func=cmd_submit)
+
+    stat = sp.add_parser("status", help="list batches, or show one batch's state")
+    stat.add_argument("id", nargs="?", help="batch id (prefix ok)")
+    stat.set_defaults(func=cmd_status)
+
+    fetch = sp.add_parser("fetch", help="write results of a finished batch as JSONL")
+    fetch.add_argument("id", help="batch id (prefix ok)")
+    fetch.add_argument("--output", "-o", help="write JSONL here instead of stdout")
+    fetch.set_defaults(func=cmd_fetch)
@@ -1,16 +1,42 @@
+import asyncio
+import codecs
+import collections
+import glob
+import json
+import math
 import mimetypes
 import os
 import sys
+import tempfile
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
-from google import genai
 from google.genai import types
 
+from . import jsonl_batch, ratelimit, response_cache
+from .clients import gemini_client, new_gemini_client
+from .context_cache import DEFAULT_TTL_MINUTES, cached_context
+from .jsonstream import ArrayItems
 from .models import GEMINI_TEXT
+from .preflight import (
+    INLINE_BUDGET,
+    count_tokens,
+    file_tokens,
+    fmt_mb,
+    inline_size,
+    inline_total,
+    plan_uploads,
+    print_estimate,
+    text_tokens,
+)
+from .uploads import uploaded_part
 
 
 MODELS = {k: GEMINI_TEXT[k] for k in ("flash", "pro")}
 
+RESPONSE_TTL = 24 * 3600
+
 BINARY_MIMES = {
     "application/pdf",
     "image/png",
@@ -24,51 +50,211 @@ BINARY_MIMES = {
     "video/webm",
 }
 
+SNIFF_BYTES = 8192
+STDIN_CHUNK = 1 << 20
+# piped input past this size is spilled to a temp file and uploaded rather
+# than held in memory and sent inline
+STDIN_SPILL_BYTES = 8 * 1024 * 1024
+LOAD_WORKERS = 16
+
+# never descended into when a --file argument is a directory
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv"}
+
 
 def guess_mime(path):
     mime, _ = mimetypes.guess_type(str(path))
     return mime or "text/plain"
 
 
-def load_file_part(path):
+def looks_binary(path):
+    """Sniff the first few KB: NUL bytes or invalid UTF-8 mean binary."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    if b"\0" in head:
+        return True
+    try:
+        # final=False so a multi-byte character cut off at the end is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
+
+def is_binary(path):
+    return guess_mime(path) in BINARY_MIMES or looks_binary(path)
+
+
+def walk_dir(root):
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(
+            d for d in dirnames if d not in SKIP_DIRS and not d.startswith(".")
+        )
+        for name in sorted(filenames):
+            if not name.startswith("."):
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def expand_files(args_files):
+    """Expand directory and glob arguments to file paths. Plain paths are kept
+    as given (missing ones are reported later); files found by expansion are
+    dropped if they are binary in a format the model can't take. Returns the
+    paths and the set of them that are binary, so later steps don't sniff
+    the same files again."""
+    files = []
+    for arg in args_files:
+        if os.path.isdir(arg):
+            found = walk_dir(arg)
+            if not found:
+                print(f"  ! no files in {arg}", file=sys.stderr)
+            files.extend(found)
+        elif not os.path.exists(arg) and glob.has_magic(arg):
+            found = sorted(f for f in glob.glob(arg, recursive=True) if os.path.isfile(f))
+            # an unmatched pattern is kept so it is reported like a missing file
+            files.extend(found or [arg])
+        else:
+            files.append(arg)
+
+    existing = [f for f in dict.fromkeys(files) if os.path.isfile(f)]
+    with ThreadPoolExecutor(LOAD_WORKERS) as pool:
+        sniffed = zip(existing, pool.map(is_binary, existing))
+        binary = {f for f, b in sniffed if b}
+    expanded = set(files) - set(args_files)
+    unsupported = {f for f in binary & expanded if guess_mime(f) not in BINARY_MIMES}
+    if unsupported:
+        print(f"  skipping {len(unsupported)} unsupported binary file(s)", file=sys.stderr)
+    kept = [f for f in dict.fromkeys(files) if f not in unsupported]
+    return kept, binary - unsupported
+
+
+def binary_part(p, mime, client=None):
+    if client is not None:
+        return uploaded_part(client, p, mime)
+    return types.Part.from_bytes(data=p.read_bytes(), mime_type=mime)
+
+
+def load_file_part(path, binary, client=None):
+    """Text files are inlined with a filename header. Binary files are sent
+    as bytes. When `client` is given the file goes through the Files API
+    instead (text as text/plain, after its header); the result is then a
+    list of parts."""
     p = Path(path)
     if not p.exists():
         print(f"error: file not found: {path}", file=sys.stderr)
         sys.exit(1)
 
-    mime = guess_mime(p)
-    if mime in BINARY_MIMES:
-        return types.Part.from_bytes(data=p.read_bytes(), mime_type=mime)
-
-    try:
-        text = p.read_text()
-    except UnicodeDecodeError:
-        return types.Part.from_bytes(data=p.read_bytes(), mime_type=mime)
+    if binary:
+        return binary_part(p, guess_mime(p), client)
 
+    if client is not None:
+        return [f"--- {p.name} ---\n", uploaded_part(client, p, "text/plain")]
+    text = p.read_text(encoding="utf-8", errors="replace")
     return f"--- {p.name} ---\n{text}"
 
 
-def build_contents(prompt, file_paths, stdin_data):
-    parts = []
+def load_file_parts(file_paths, binary, client=None, upload=()):
+    """Load (and upload) files on a thread pool, keeping their order."""
+    with ThreadPoolExecutor(LOAD_WORKERS) as pool:
+        loaded = pool.map(
+            lambda fp: load_file_part(
+                fp, fp in binary, client if fp in upload else None
+            ),
+            file_paths,
+        )
+        parts = []
+        for part in loaded:
+            parts += part if isinstance(part, list) else [part]
+        return parts
+
+
+def read_stdin():
+    """Read piped stdin in bounded chunks. Returns (text, None), or
+    (None, path) once it outgrows STDIN_SPILL_BYTES and has been copied to
+    a temp file; the caller removes the file."""
+    chunks, size = [], 0
+    while chunk := sys.stdin.read(STDIN_CHUNK):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size > STDIN_SPILL_BYTES:
+            break
+    else:
+        return "".join(chunks) or None, None
+
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", prefix="gski-stdin-", suffix=".txt", delete=False
+    ) as f:
+        f.writelines(chunks)
+        chunks = None
+        while chunk := sys.stdin.read(STDIN_CHUNK):
+            f.write(chunk)
+    return None, Path(f.name)
+
+
+def build_contents(
+    prompt, file_paths, binary, stdin_data, client=None, upload=(), stdin_file=None
+):
+    parts = load_file_parts(file_paths, binary, client, upload)
+
+    # header and body as separate parts so the input isn't copied again
+    if stdin_file:
+        parts += ["--- stdin ---\n", uploaded_part(client, stdin_file, "text/plain")]
+    elif stdin_data:
+        parts += ["--- stdin ---\n", stdin_data]
+
+    parts.append(prompt)
+    return parts
+
 
+def route(file_paths, binary, stdin_data, prompt):
+    """Files to send through the Files API so the rest fits inline. Raises
+    ValueError if even that leaves too much inline (a huge prompt)."""
+    missing = [fp for fp in file_paths if not Path(fp).exists()]
+    if missing:
+        return set()  # load_file_part reports these
+    extra = len((stdin_data or "").encode()) + len(prompt.encode())
+    upload = plan_uploads(file_paths, binary, extra)
+    inline = inline_total(file_paths, binary, upload, extra)
+    if inline > INLINE_BUDGET:
+        raise ValueError(
+            f"request is {fmt_mb(inline)} inline after moving every file to "
+            f"the Files API (limit {fmt_mb(INLINE_BUDGET)}); pass the large "
+            "input with --file or stdin instead of the prompt"
+        )
+    return upload
+
+
+def estimate_tokens(file_paths, stdin_size, prompt, system):
+    tokens = text_tokens(prompt) + text_tokens(system or "") + text_tokens(stdin_size)
     for fp in file_paths:
-        parts.append(load_file_part(fp))
+        tokens += file_tokens(fp, guess_mime(fp))
+    return tokens
 
-    if stdin_data:
-        parts.append(f"--- stdin ---\n{stdin_data}")
 
-    parts.append(prompt)
-    return parts
+def load_schema(path):
+    try:
+        return json.loads(Path(path).read_text())
+    except FileNotFoundError:
+        print(f"error: schema file not found: {path}", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"error: {path}: invalid JSON schema ({e})", file=sys.stderr)
+        sys.exit(1)
 
 
-def build_config(args):
+def build_config(args, cached_content=None):
     kwargs = {}
 
-    if args.system:
+    if cached_content:
+        # the system instruction lives in the cache and may not be repeated
+        kwargs["cached_content"] = cached_content
+    elif args.system:
         kwargs["system_instruction"] = args.system
 
-    if args.json:
+    if args.json or args.schema:
         kwargs["response_mime_type"] = "application/json"
+    if args.schema:
+        kwargs["response_json_schema"] = load_schema(args.schema)
 
     if args.no_think:
         kwargs["thinking_config"] = types.ThinkingConfig(thinking_budget=0)
@@ -78,16 +264,400 @@ def build_config(args):
     return types.GenerateContentConfig(**kwargs)
 
 
+# ---------------------------------------------------------------------------
+# batch mode
+
+JOB_FIELDS = ("files", "model", "system", "json", "schema", "no_think")
+
+
+def read_jobs(path):
+    jobs = []
+    for n, line in jsonl_batch.read_lines(path):
+        try:
+            job = json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"error: {path}:{n}: invalid JSON ({e})", file=sys.stderr)
+            sys.exit(1)
+        if not isinstance(job, dict) or not job.get("prompt"):
+            print(f"error: {path}:{n}: each job needs a \"prompt\"", file=sys.stderr)
+            sys.exit(1)
+        jobs.append(job)
+    return jobs
+
+
+def job_args(args, job):
+    """CLI flags act as defaults for every job; per-job fields override them."""
+    merged = vars(args).copy()
+    merged.update({k: job[k] for k in JOB_FIELDS if k in job})
+    if isinstance(merged["files"], str):
+        merged["files"] = [merged["files"]]
+    if "files" in job:
+        merged["files"], merged["binary"] = expand_files(merged["files"])
+    return Namespace(**merged)
+
+
+async def run_job(client, sem, args, job, index):
+    record = {"index": index}
+    if "id" in job:
+        record["id"] = job["id"]
+
+    # file expansion, reads and uploads are blocking; keep them off the loop
+    # so one large job doesn't stall the others
+    try:
+        jargs = await asyncio.to_thread(job_args, args, job)
+        missing = [f for f in jargs.files if not Path(f).exists()]
+    except (TypeError, ValueError, OSError) as e:
+        record["error"] = f"invalid job: {e}"
+        return record
+    if missing:
+        record["error"] = f"file not found: {', '.join(missing)}"
+        return record
+    if jargs.model not in MODELS:
+        record["error"] = f"unknown model {jargs.model!r}"
+        return record
+
+    def contents():
+        upload = route(jargs.files, jargs.binary, None, job["prompt"])
+        return build_contents(
+            job["prompt"], jargs.files, jargs.binary, None, client, upload
+        )
+
+    async with sem:
+        try:
+            response = await response_cache.agenerate(
+                client,
+                "llm-process",
+                RESPONSE_TTL,
+                fresh=jargs.fresh,
+                model=MODELS[jargs.model],
+                contents=await asyncio.to_thread(contents),
+                config=build_config(jargs),
+            )
+            record["text"] = response.text
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+# ---------------------------------------------------------------------------
+# map-reduce mode
+
+CHARS_PER_TOKEN = 4
+
+MAP_PROMPT = (
+    "{prompt}\n\n"
+    "The input above is one part of a larger input. Answer using only this "
+    "part; a later pass will combine the answers from every part."
+)
+
+REDUCE_PROMPT = (
+    "{prompt}\n\n"
+    "Above are partial answers, each produced from a different part of a "
+    "larger input. Combine them into a single complete answer, merging "
+    "duplicates and keeping every relevant detail."
+)
+
+
+def text_sources(file_paths, binary, stdin):
+    """(name, text stream) per input, read lazily."""
+    for fp in file_paths:
+        p = Path(fp)
+        if not p.exists():
+            print(f"error: file not found: {fp}", file=sys.stderr)
+            sys.exit(1)
+        if fp in binary:
+            print(f"error: --map-reduce needs text input: {fp}", file=sys.stderr)
+            sys.exit(1)
+        with open(p, encoding="utf-8", errors="replace") as f:
+            yield p.name, f
+    if stdin is not None:
+        yield "stdin", stdin
+
+
+def read_pieces(f, max_chars):
+    """Lines of `f`, read in fixed-size blocks so a single huge line (a log
+    or JSON dump without newlines) is never held whole. A line longer than
+    `max_chars` comes out in several pieces."""
+    carry = ""
+    while block := f.read(max_chars):
+        lines = (carry + block).split("\n")
+        carry = lines.pop()
+        for line in lines:
+            yield line + "\n"
+        if len(carry) >= max_chars:
+            # whole max_chars slices of the line so far, as if it were whole
+            cut = len(carry) - len(carry) % max_chars
+            yield carry[:cut]
+            carry = carry[cut:]
+    if carry:
+        yield carry
+
+
+def iter_chunks(sources, max_chars):
+    buf, size = [], 0
+    for name, f in sources:
+        started = False
+        for line in read_pieces(f, max_chars):
+            for i in range(0, len(line), max_chars):
+                piece = line[i : i + max_chars]
+                if buf and size + len(piece) > max_chars:
+                    yield "".join(buf)
+                    buf, size = [], 0
+                if not buf or not started:
+                    label = f"{name} (continued)" if started else name
+                    buf.append(f"--- {label} ---\n")
+                    size += len(buf[-1])
+                    started = True
+                buf.append(piece)
+                size += len(piece)
+    if buf:
+        yield "".join(buf)
+
+
+def pack(texts, max_chars):
+    """Greedily group partial answers so each group fits one request."""
+    groups, group, size = [], [], 0
+    for t in texts:
+        if group and size + len(t) > max_chars:
+            groups.append(group)
+            group, size = [], 0
+        group.append(t)
+        size += len(t)
+    if group:
+        groups.append(group)
+    return groups
+
+
+async def ask(client, args, config, text, prompt):
+    response = await response_cache.agenerate(
+        client,
+        "llm-process",
+        RESPONSE_TTL,
+        fresh=args.fresh,
+        model=MODELS[args.model],
+        contents=[text, prompt],
+        config=config,
+    )
+    return response.text or ""
+
+
+async def map_reduce(args, sources):
+    client = new_gemini_client()
+    config = build_config(args)
+    max_chars = args.chunk_tokens * CHARS_PER_TOKEN
+    sem = asyncio.Semaphore(max(1, args.concurrency))
+
+    async def ask_limited(text, prompt):
+        try:
+            return await ask(client, args, config, text, prompt)
+        finally:
+            sem.release()
+
+    try:
+        # acquire before reading the next chunk so at most `concurrency`
+        # chunks are held in memory at once
+        tasks = []
+        map_prompt = MAP_PROMPT.format(prompt=args.prompt)
+        for chunk in iter_chunks(sources, max_chars):
+            await sem.acquire()
+            tasks.append(asyncio.create_task(ask_limited(chunk, map_prompt)))
+        print(f"map: {len(tasks)} chunk(s)", file=sys.stderr)
+        partials = await asyncio.gather(*tasks)
+
+        if len(partials) == 1:
+            return partials[0]
+
+        reduce_prompt = REDUCE_PROMPT.format(prompt=args.prompt)
+        level = 0
+        while len(partials) > 1:
+            level += 1
+            labelled = [
+                f"--- partial answer {i + 1} ---\n{t}\n" for i, t in enumerate(partials)
+            ]
+            groups = pack(labelled, max_chars)
+            if len(groups) == len(partials):
+                # every answer fills a chunk on its own; pair them up anyway
+                # so each level still halves the count
+                groups = [labelled[i : i + 2] for i in range(0, len(labelled), 2)]
+            print(f"reduce {level}: {len(groups)} group(s)", file=sys.stderr)
+            tasks = []
+            for g in groups:
+                await sem.acquire()
+                tasks.append(
+                    asyncio.create_task(ask_limited("".join(g), reduce_prompt))
+                )
+            partials = await asyncio.gather(*tasks)
+        return partials[0]
+    finally:
+        await client.aio.aclose()
+
+
+async def per_chunk(args, sources):
+    """Answer the prompt for each chunk on its own, printing answers in input
+    order. At most `concurrency` chunks are read ahead of the output."""
+    client = new_gemini_client()
+    config = build_config(args)
+    max_chars = args.chunk_tokens * CHARS_PER_TOKEN
+    pending = collections.deque()
+    try:
+        for chunk in iter_chunks(sources, max_chars):
+            pending.append(
+                asyncio.create_task(ask(client, args, config, chunk, args.prompt))
+            )
+            if len(pending) >= max(1, args.concurrency):
+                print(await pending.popleft(), flush=True)
+        while pending:
+            print(await pending.popleft(), flush=True)
+    finally:
+        for task in pending:
+            task.cancel()
+        await client.aio.aclose()
+
+
+# ---------------------------------------------------------------------------
+# dry run
+
+
+def read_stdin_size():
+    n = 0
+    while chunk := sys.stdin.read(1 << 20):
+        n += len(chunk)
+    return n
+
+
+def dry_run(args, stdin_data, stdin_size, upload):
+    for fp in args.files:
+        if not Path(fp).exists():
+            print(f"error: file not found: {fp}", file=sys.stderr)
+            sys.exit(1)
+
+    model = MODELS[args.model]
+    tokens = estimate_tokens(args.files, stdin_size, args.prompt, args.system)
+
+    counted = False
+    inline = sum(inline_size(fp, fp in args.binary) for fp in args.files)
+    fits = inline + stdin_size + len(args.prompt) <= INLINE_BUDGET
+    if (
+        fits
+        and not upload
+        and not (args.map_reduce or args.per_chunk)
+        and os.environ.get("GEMINI_API_KEY")
+    ):
+        n = count_tokens(
+            gemini_client(),
+            model,
+            build_contents(args.prompt, args.files, args.binary, stdin_data),
+        )
+        if n is not None:
+            tokens, counted = n + text_tokens(args.system or ""), True
+
+    requests = 1
+    if args.map_reduce or args.per_chunk:
+        # map calls only; the reduce pass adds a few more over the answers
+        requests = max(1, math.ceil(tokens / args.chunk_tokens))
+    print_estimate(model, tokens, counted, sorted(upload), requests=requests)
+
+
+def dry_run_batch(args, jobs):
+    by_model = {}
+    skipped = 0
+    for job in jobs:
+        jargs = job_args(args, job)
+        if jargs.model not in MODELS or not all(Path(f).exists() for f in jargs.files):
+            skipped += 1
+            continue
+        tokens, uploads, n = by_model.get(jargs.model, (0, set(), 0))
+        tokens += estimate_tokens(jargs.files, 0, job["prompt"], jargs.system)
+        try:
+            uploads |= route(jargs.files, jargs.binary, None, job["prompt"])
+        except ValueError:
+            skipped += 1
+            continue
+        by_model[jargs.model] = (tokens, uploads, n + 1)
+
+    for i, (name, (tokens, uploads, n)) in enumerate(sorted(by_model.items())):
+        if i:
+            print()
+        print_estimate(MODELS[name], tokens, uploads=sorted(uploads), requests=n)
+    if skipped:
+        print(
+            f"\nskipped {skipped} job(s) with a missing file, an unknown model "
+            "or too much inline input"
+        )
+
+
+def stream_response(client, model, contents, config, jsonl=False):
+    """Print the response as it arrives. With `jsonl`, a top-level JSON
+    array is printed one compact element per line as each completes."""
+    def open_stream():
+        return client.models.generate_content_stream(
+            model=model, contents=contents, config=config
+        )
+
+    items = ArrayItems() if jsonl else None
+    for chunk in ratelimit.call_stream(model, contents, open_stream):
+        if not chunk.text:
+            continue
+        if items is None or items.error is not None:
+            # once the JSON has broken, the rest is passed through as-is
+            sys.stdout.write(chunk.text)
+        else:
+            for item in items.feed(chunk.text):
+                sys.stdout.write(json.dumps(item, ensure_ascii=False) + "\n")
+            if items.error is not None:
+                sys.stdout.write(items.rest())
+        sys.stdout.flush()
+
+    if items is None:
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+        return
+    try:
+        doc = items.close()
+    except ValueError as e:
+        if items.error is None:
+            # keep the model's output; it is often nearly valid
+            sys.stdout.write(items.rest())
+        sys.stdout.write("\n")
+        sys.stdout.flush()
+        print(f"error: response is not valid JSON: {e}", file=sys.stderr)
+        sys.exit(1)
+    if doc is not None:
+        sys.stdout.write(json.dumps(doc, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+EXCLUSIVE_FLAGS = [
+    ("batch", "stream"),
+    ("batch", "cache"),
+    ("batch", "map_reduce"),
+    ("map_reduce", "cache"),
+    ("map_reduce", "stream"),
+    ("per_chunk", "batch"),
+    ("per_chunk", "cache"),
+    ("per_chunk", "map_reduce"),
+    ("per_chunk", "stream"),
+]
+
+
 def register(subparsers):
-    p = subparsers.add_parser("llm-process", help="process files and text with Gemini")
-    p.add_argument("prompt", help="prompt / query to send to the model")
+    p = subparsers.add_parser(
+        "llm-process",
+        help="process files and text with Gemini",
+        epilog="for the Gemini Batch API see: gski llm-process batch -h. "
+        "A prompt that is literally 'batch' must come after an option, "
+        "e.g. gski llm-process -f notes.md batch",
+    )
+    p.add_argument(
+        "prompt", nargs="?", help="prompt / query to send to the model"
+    )
     p.add_argument(
         "--file",
         "-f",
         action="append",
         default=[],
         dest="files",
-        help="input file(s) to process (repeatable)",
+        help="input file, directory or glob pattern (repeatable)",
     )
     p.add_argument(
         "--model",
@@ -106,33 +676,198 @@ def register(subparsers):
         action="store_true",
         help="request JSON output",
     )
+    p.add_argument(
+        "--schema",
+        metavar="FILE",
+        help="JSON Schema file the response must follow (implies --json); "
+        "with --stream, a top-level array is emitted as JSONL item by item",
+    )
     p.add_argument(
         "--no-think",
         action="store_true",
         help="disable thinking / reasoning",
     )
+    p.add_argument(
+        "--batch",
+        metavar="JSONL",
+        help="run one job per JSONL line concurrently ('-' for stdin); "
+        "results are written as JSONL",
+    )
+    p.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=8,
+        help="max in-flight requests in --batch / --map-reduce / --per-chunk mode "
+        "(default: 8)",
+    )
+    p.add_argument(
+        "--ordered",
+        action="store_true",
+        help="emit --batch results in input order instead of completion order",
+    )
+    p.add_argument(
+        "--cache",
+        action="store_true",
+        help="cache the --file set and system instruction server-side and "
+        "reuse it across prompts",
+    )
+    p.add_argument(
+        "--cache-ttl",
+        type=int,
+        default=DEFAULT_TTL_MINUTES,
+        metavar="MINUTES",
+        help=f"lifetime of a newly created cache (default: {DEFAULT_TTL_MINUTES})",
+    )
+    p.add_argument(
+        "--map-reduce",
+        action="store_true",
+        help="split large text inputs into chunks, answer per chunk "
+        "concurrently, then combine the partial answers",
+    )
+    p.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=100_000,
+        metavar="N",
+        help="approximate tokens per --map-reduce / --per-chunk chunk "
+        "(default: 100000)",
+    )
+    p.add_argument(
+        "--per-chunk",
+        action="store_true",
+        help="stream text input in chunks and answer the prompt for each "
+        "chunk separately",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="write the response to stdout as it is generated",
+    )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print estimated tokens, cost and latency without generating",
+    )
+    p.add_argument(
+        "--fresh",
+        action="store_true",
+        help="ignore cached responses and always call the API",
+    )
     p.set_defaults(func=run)
 
 
 def run(args):
-    if not os.environ.get("GEMINI_API_KEY"):
+    if not args.dry_run and not os.environ.get("GEMINI_API_KEY"):
         print("error: GEMINI_API_KEY env var required", file=sys.stderr)
         sys.exit(1)
 
-    stdin_data = None
+    for a, b in EXCLUSIVE_FLAGS:
+        if getattr(args, a) and getattr(args, b):
+            print(
+                f"error: --{a.replace('_', '-')} cannot be combined with "
+                f"--{b.replace('_', '-')}",
+                file=sys.stderr,
+            )
+            sys.exit(1)
+
+    args.files, args.binary = expand_files(args.files)
+
+    if args.cache and not args.files:
+        print("error: --cache requires --file", file=sys.stderr)
+        sys.exit(1)
+
+    if args.batch:
+        jobs = read_jobs(args.batch)
+        if args.dry_run:
+            dry_run_batch(args, jobs)
+            return
+        if asyncio.run(jsonl_batch.run(args, jobs, run_job)):
+            sys.exit(1)
+        return
+
+    if not args.prompt:
+        print("error: prompt required (or use --batch)", file=sys.stderr)
+        sys.exit(1)
+
+    if args.map_reduce or args.per_chunk:
+        stdin = None if sys.stdin.isatty() else sys.stdin
+        if not args.files and stdin is None:
+            print("error: provide --file or pipe data via stdin", file=sys.stderr)
+            sys.exit(1)
+        if args.dry_run:
+            dry_run(args, None, read_stdin_size() if stdin else 0, set())
+            return
+        sources = text_sources(args.files, args.binary, stdin)
+        if args.per_chunk:
+            asyncio.run(per_chunk(args, sources))
+        else:
+            print(asyncio.run(map_reduce(args, sources)))
+        return
+
+    stdin_data = stdin_file = None
     if not sys.stdin.isatty():
-        stdin_data = sys.stdin.read()
+        stdin_data, stdin_file = read_stdin()
+    try:
+        process(args, stdin_data, stdin_file)
+    finally:
+        if stdin_file:
+            stdin_file.unlink(missing_ok=True)
 
-    if not args.files and not stdin_data:
+
+def process(args, stdin_data, stdin_file):
+    if not args.files and not stdin_data and not stdin_file:
         print("error: provide --file or pipe data via stdin", file=sys.stderr)
         sys.exit(1)
 
-    contents = build_contents(args.prompt, args.files, stdin_data)
-    config = build_config(args)
-    client = genai.Client()
+    stdin_size = stdin_file.stat().st_size if stdin_file else len(stdin_data or "")
+    try:
+        upload = route(args.files, args.binary, stdin_data, args.prompt)
+    except ValueError as e:
+        print(f"error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if stdin_file:
+        upload.add(str(stdin_file))
+    if args.dry_run:
+        dry_run(args, stdin_data, stdin_size, upload)
+        return
+
+    client = gemini_client()
     model = MODELS[args.model]
 
-    response = client.models.generate_content(
+    cache_name = None
+    if args.cache:
+        cache_name = cached_context(
+            client,
+            model,
+            args.files,
+            args.system,
+            args.cache_ttl,
+            lambda: load_file_parts(args.files, args.binary, client, upload),
+        )
+
+    files = [] if cache_name else args.files
+    contents = build_contents(
+        args.prompt,
+        files,
+        args.binary,
+        stdin_data,
+        client,
+        upload,
+        stdin_file=stdin_file,
+    )
+    config = build_config(args, cached_content=cache_name)
+
+    if args.stream:
+        jsonl = bool(args.json or args.schema)
+        stream_response(client, model, contents, config, jsonl=jsonl)
+        return
+
+    response = response_cache.generate(
+        client,
+        "llm-process",
+        RESPONSE_TTL,
+        fresh=args.fresh,
         model=model,
         contents=contents,
         config=config,
@@ -4,10 +4,11 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
-from google import genai
 from google.genai import types
 from PIL import Image
 
+from . import ratelimit
+from .clients import gemini_client
 from .models import GEMINI_IMAGE as MODELS
 
 ASPECT_RATIOS = [
@@ -153,15 +154,19 @@ def run(args):
         print("error: GEMINI_API_KEY env var required", file=sys.stderr)
         sys.exit(1)
 
-    client = genai.Client()
+    client = gemini_client()
     model = MODELS[args.model]
     contents = build_contents(args.prompt, args.image)
     config = build_config(args)
 
-    response = client.models.generate_content(
-        model=model,
-        contents=contents,
-        config=config,
+    response = ratelimit.call(
+        model,
+        contents,
+        lambda: client.models.generate_content(
+            model=model,
+            contents=contents,
+            config=config,
+        ),
     )
 
     saved = save_images(response, args.output_dir, ext=args.format)
@@ -1,6 +1,7 @@
 import base64
 import io
 import json
+import mimetypes
 import os
 import sys
 import urllib.request
@@ -8,15 +9,20 @@ from datetime import datetime
 from pathlib import Path
 
 import numpy as np
-from google import genai
 from google.genai import types
 from PIL import Image, ImageDraw
 
+from . import response_cache
+from .clients import gemini_client
 from .models import GEMINI_TEXT
+from .preflight import IMAGE_TOKENS, plan_uploads, print_estimate, text_tokens
+from .uploads import uploaded_part
 
 
 MODELS = {k: GEMINI_TEXT[k] for k in ("flash", "pro")}
 
+RESPONSE_TTL = 24 * 3600
+
 DETECT_SUFFIX = " The box_2d should be [ymin, xmin, ymax, xmax] normalized to 0-1000."
 
 
@@ -34,11 +40,15 @@ def build_config(args):
     return types.GenerateContentConfig(**kwargs)
 
 
-def build_contents(prompt, image_paths, urls):
+def build_contents(prompt, image_paths, urls, client=None, upload=()):
     contents = []
 
     for p in image_paths:
-        contents.append(Image.open(p))
+        if p in upload:
+            mime, _ = mimetypes.guess_type(str(p))
+            contents.append(uploaded_part(client, p, mime or "image/jpeg"))
+        else:
+            contents.append(Image.open(p))
 
     for url in urls:
         req = urllib.request.Request(url, headers={"User-Agent": "nanoscope/1.0"})
@@ -157,6 +167,16 @@ def register(subparsers):
         default="./output",
         help="output directory for segmentation (default: ./output)",
     )
+    p.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print estimated tokens, cost and latency without calling the model",
+    )
+    p.add_argument(
+        "--fresh",
+        action="store_true",
+        help="ignore cached responses and always call the API",
+    )
     p.set_defaults(func=run)
 
 
@@ -174,7 +194,7 @@ def run(args):
             print(f"error: image not found: {p}", file=sys.stderr)
             sys.exit(1)
 
-    if not os.environ.get("GEMINI_API_KEY"):
+    if not args.dry_run and not os.environ.get("GEMINI_API_KEY"):
         print("error: GEMINI_API_KEY env var required", file=sys.stderr)
         sys.exit(1)
 
@@ -182,18 +202,30 @@ def run(args):
     if args.detect:
         prompt += DETECT_SUFFIX
 
+    model = MODELS[args.model]
+    # URL images are fetched inline and their size is unknown up front
+    upload = plan_uploads(args.image, set(args.image), len(prompt))
+
+    if args.dry_run:
+        tokens = text_tokens(prompt) + IMAGE_TOKENS * (len(args.image) + len(args.url))
+        print_estimate(model, tokens, uploads=sorted(upload))
+        return
+
     images = [Image.open(p) for p in args.image]
 
     if args.segment and images:
         for im in images:
             im.thumbnail([1024, 1024], Image.Resampling.LANCZOS)
 
-    client = genai.Client()
-    model = MODELS[args.model]
-    contents = build_contents(prompt, args.image, args.url)
+    client = gemini_client()
+    contents = build_contents(prompt, args.image, args.url, client, upload)
     config = build_config(args)
 
-    response = client.models.generate_content(
+    response = response_cache.generate(
+        client,
+        "nanoscope",
+        RESPONSE_TTL,
+        fresh=args.fresh,
         model=model,
         contents=contents,
         config=config,
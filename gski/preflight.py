@@ -0,0 +1,163 @@
+"""Request sizing: inline-vs-upload routing and token / cost estimates.
+
+The estimator is deliberately cheap (file sizes and a few header reads) so
+it can run before every request; `count_tokens` is used on top of it for
+`--dry-run` when the request can be counted without uploading anything.
+"""
+
+import math
+import re
+import struct
+import sys
+from pathlib import Path
+
+from .models import GEMINI_TEXT
+
+# The API rejects inline requests over 20 MB; keep headroom for the prompt,
+# JSON framing and config.
+INLINE_LIMIT = 20 * 1024 * 1024
+INLINE_BUDGET = INLINE_LIMIT - 1024 * 1024
+
+CONTEXT_WINDOW = 1_048_576
+
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1120
+PDF_PAGE_TOKENS = 560
+AUDIO_TOKENS_PER_S = 32
+VIDEO_TOKENS_PER_S = 300
+# used to turn compressed media size into a duration when headers don't say
+AUDIO_BYTES_PER_S = 16_000  # ~128 kbps
+VIDEO_BYTES_PER_S = 125_000  # ~1 Mbps
+
+# USD per 1M tokens (input, output), list prices at the time of writing.
+PRICES = {
+    GEMINI_TEXT["flash"]: (0.50, 3.00),
+    GEMINI_TEXT["flash-lite"]: (0.10, 0.40),
+    GEMINI_TEXT["pro"]: (2.00, 12.00),
+}
+
+# (seconds of fixed overhead, prefill tokens per second) for a rough
+# time-to-first-token figure.
+LATENCY = {
+    GEMINI_TEXT["flash"]: (1.0, 40_000),
+    GEMINI_TEXT["flash-lite"]: (0.5, 60_000),
+    GEMINI_TEXT["pro"]: (3.0, 15_000),
+}
+
+PDF_PAGE_RE = re.compile(rb"/Type\s*/Page(?![a-zA-Z])")
+
+
+def inline_size(path, binary):
+    """Bytes a file adds to an inline request (binary parts are base64'd)."""
+    size = Path(path).stat().st_size
+    return math.ceil(size * 4 / 3) if binary else size
+
+
+def plan_uploads(paths, binary, extra_bytes=0):
+    """Pick which files go through the Files API so the inline remainder
+    fits one request. Binary files are moved out first, then text files,
+    largest first in each group."""
+    sizes = {p: inline_size(p, p in binary) for p in paths}
+    total = sum(sizes.values()) + extra_bytes
+    upload = set()
+    text = [p for p in paths if p not in binary]
+    for group in (binary, text):
+        for p in sorted(group, key=lambda p: sizes[p], reverse=True):
+            if total <= INLINE_BUDGET:
+                return upload
+            upload.add(p)
+            total -= sizes[p]
+    return upload
+
+
+def inline_total(paths, binary, upload, extra_bytes=0):
+    """Bytes left in the inline request once `upload` is moved out."""
+    return extra_bytes + sum(
+        inline_size(p, p in binary) for p in paths if p not in upload
+    )
+
+
+# ---------------------------------------------------------------------------
+# token estimates
+
+
+def text_tokens(text_or_size):
+    n = text_or_size if isinstance(text_or_size, int) else len(text_or_size)
+    return math.ceil(n / CHARS_PER_TOKEN)
+
+
+def _wav_seconds(path):
+    with open(path, "rb") as f:
+        header = f.read(44)
+    if len(header) < 44 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        return None
+    byte_rate = struct.unpack("<I", header[28:32])[0]
+    if not byte_rate:
+        return None
+    return Path(path).stat().st_size / byte_rate
+
+
+def _pdf_pages(path):
+    with open(path, "rb") as f:
+        return len(PDF_PAGE_RE.findall(f.read())) or 1
+
+
+def file_tokens(path, mime):
+    size = Path(path).stat().st_size
+    if mime.startswith("image/"):
+        return IMAGE_TOKENS
+    if mime == "application/pdf":
+        return _pdf_pages(path) * PDF_PAGE_TOKENS
+    if mime.startswith("audio/"):
+        seconds = _wav_seconds(path) or size / AUDIO_BYTES_PER_S
+        return math.ceil(seconds * AUDIO_TOKENS_PER_S)
+    if mime.startswith("video/"):
+        return math.ceil(size / VIDEO_BYTES_PER_S * VIDEO_TOKENS_PER_S)
+    return text_tokens(size)
+
+
+def count_tokens(client, model, contents):
+    """Exact count from the API, or None if it can't be had."""
+    try:
+        return client.models.count_tokens(model=model, contents=contents).total_tokens
+    except Exception as e:
+        print(f"  ! count_tokens failed ({e}); using local estimate", file=sys.stderr)
+        return None
+
+
+# ---------------------------------------------------------------------------
+# report
+
+
+def fmt_mb(n):
+    return f"{n / (1024 * 1024):.1f} MB"
+
+
+def print_estimate(model, tokens, counted=False, uploads=(), requests=1):
+    kind = "counted" if counted else "estimated"
+    print(f"model:     {model}")
+    if requests > 1:
+        print(f"requests:  {requests:,}")
+    print(f"input:     {'' if counted else '~'}{tokens:,} tokens ({kind})")
+
+    price = PRICES.get(model)
+    if price:
+        cost = tokens / 1e6 * price[0]
+        print(f"cost:      ~${cost:.4f} input (+ ${price[1]:.2f} per 1M output tokens)")
+
+    latency = LATENCY.get(model)
+    if latency:
+        per_request = tokens / requests
+        seconds = latency[0] + per_request / latency[1]
+        label = "per request" if requests > 1 else "to first token"
+        print(f"latency:   ~{seconds:.1f}s {label}")
+
+    if uploads:
+        total = sum(Path(p).stat().st_size for p in uploads)
+        print(f"uploads:   {len(uploads)} file(s), {fmt_mb(total)} via Files API")
+
+    if tokens / requests > CONTEXT_WINDOW:
+        print(
+            f"warning:   exceeds the {CONTEXT_WINDOW:,}-token context window",
+            file=sys.stderr,
+        )
@@ -0,0 +1,255 @@
+"""Client-side throttling for Gemini calls, shared by every gski process.
+
+Each model gets a requests-per-minute and a tokens-per-minute bucket kept in
+a small sqlite file, so parallel workers draw from the same budget instead
+of each assuming it has the whole quota. Calls that still come back 429/503
+are retried with exponential backoff and full jitter, waiting at least as
+long as the server's retry hint; a 429 also drains the shared bucket so the
+other processes back off too.
+
+Limits default to LIMITS and can be overridden with GSKI_RPM / GSKI_TPM
+(applied to every model; 0 disables that bucket). GSKI_MAX_RETRIES sets the
+retry count.
+"""
+
+import asyncio
+import itertools
+import os
+import random
+import re
+import sqlite3
+import sys
+import time
+
+from google.genai import errors, types
+
+from .models import GEMINI_IMAGE, GEMINI_TEXT
+from .paths import CACHE_DIR
+from .preflight import IMAGE_TOKENS, text_tokens
+
+DB_PATH = CACHE_DIR / "ratelimit.sqlite"
+
+# (requests/min, input tokens/min); conservative paid-tier figures
+LIMITS = {
+    GEMINI_TEXT["flash"]: (1000, 1_000_000),
+    GEMINI_TEXT["flash-lite"]: (4000, 4_000_000),
+    GEMINI_TEXT["pro"]: (150, 2_000_000),
+    GEMINI_IMAGE["flash2"]: (500, 500_000),
+    GEMINI_IMAGE["flash3"]: (500, 500_000),
+    GEMINI_IMAGE["pro"]: (100, 500_000),
+}
+
+RETRY_CODES = {429, 503}
+DEFAULT_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    model    TEXT PRIMARY KEY,
+    requests REAL NOT NULL,
+    tokens   REAL NOT NULL,
+    updated  REAL NOT NULL
+);
+"""
+
+
+def limits(model):
+    rpm, tpm = LIMITS.get(model, (0, 0))
+    if os.environ.get("GSKI_RPM"):
+        rpm = float(os.environ["GSKI_RPM"])
+    if os.environ.get("GSKI_TPM"):
+        tpm = float(os.environ["GSKI_TPM"])
+    return rpm, tpm
+
+
+def max_retries():
+    return int(os.environ.get("GSKI_MAX_RETRIES", DEFAULT_RETRIES))
+
+
+def connect():
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+# ---------------------------------------------------------------------------
+# token estimate
+
+
+def request_tokens(contents):
+    """Rough input size of a request, for the tokens/min bucket."""
+    if isinstance(contents, str):
+        return text_tokens(contents)
+    if isinstance(contents, (list, tuple)):
+        return sum(request_tokens(c) for c in contents)
+    if isinstance(contents, types.Content):
+        return request_tokens(contents.parts or [])
+    if isinstance(contents, types.Part) and contents.text is not None:
+        return text_tokens(contents.text)
+    # images, file references and other media
+    return IMAGE_TOKENS
+
+
+# ---------------------------------------------------------------------------
+# bucket
+
+
+def _take(model, tokens):
+    """Take one request and `tokens` from the model's buckets. Returns 0 on
+    success, else the seconds to wait before trying again."""
+    rpm, tpm = limits(model)
+    if not rpm and not tpm:
+        return 0
+    # a request bigger than the whole minute budget goes through once the
+    # bucket is full rather than never
+    tokens = min(tokens, tpm) if tpm else 0
+
+    db = connect()
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        now = time.time()
+        row = db.execute(
+            "SELECT requests, tokens, updated FROM buckets WHERE model = ?", (model,)
+        ).fetchone()
+        req, tok, updated = row if row else (rpm, tpm, now)
+        elapsed = max(0.0, now - updated)
+        if now >= updated:
+            req = min(rpm, req + elapsed * rpm / 60)
+            tok = min(tpm, tok + elapsed * tpm / 60)
+
+        wait = 0.0
+        if now < updated:
+            # another process drained the bucket after a 429
+            wait = updated - now
+        else:
+            if rpm and req < 1:
+                wait = max(wait, (1 - req) * 60 / rpm)
+            if tpm and tok < tokens:
+                wait = max(wait, (tokens - tok) * 60 / tpm)
+
+        if wait == 0:
+            # refill and take are written together with the time they were
+            # computed for; on the wait path nothing is written, so the same
+            # elapsed time is never credited twice
+            db.execute(
+                "INSERT OR REPLACE INTO buckets VALUES (?, ?, ?, ?)",
+                (model, req - (1 if rpm else 0), tok - tokens, now),
+            )
+        db.execute("COMMIT")
+        return wait
+    finally:
+        db.close()
+
+
+def _drain(model, delay):
+    """After a 429: empty the buckets and hold them for `delay` seconds."""
+    db = connect()
+    try:
+        db.execute(
+            "INSERT OR REPLACE INTO buckets VALUES (?, 0, 0, ?)",
+            (model, time.time() + delay),
+        )
+    finally:
+        db.close()
+
+
+def acquire(model, tokens):
+    while wait := _take(model, tokens):
+        time.sleep(wait)
+
+
+async def aacquire(model, tokens):
+    # _take can block on the sqlite lock for a while under contention
+    while wait := await asyncio.to_thread(_take, model, tokens):
+        await asyncio.sleep(wait)
+
+
+# ---------------------------------------------------------------------------
+# retry
+
+RETRY_DELAY_RE = re.compile(r"^([\d.]+)s$")
+
+
+def retry_hint(e):
+    """Seconds the server asked us to wait, from Retry-After or RetryInfo."""
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            pass
+    details = e.details.get("error", e.details) if isinstance(e.details, dict) else {}
+    for d in details.get("details") or []:
+        m = RETRY_DELAY_RE.match(str(d.get("retryDelay", "")))
+        if m:
+            return float(m.group(1))
+    return None
+
+
+def _backoff(e, attempt, model):
+    """Seconds to sleep before retrying `e`, or None to give up."""
+    if not isinstance(e, errors.APIError) or e.code not in RETRY_CODES:
+        return None
+    if attempt >= max_retries():
+        return None
+    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+    hint = retry_hint(e)
+    if hint is not None:
+        delay = max(delay, hint)
+    if e.code == 429:
+        _drain(model, delay)
+    print(
+        f"  ! {e.code} from {model}; retrying in {delay:.1f}s "
+        f"({attempt + 1}/{max_retries()})",
+        file=sys.stderr,
+    )
+    return delay
+
+
+def call(model, contents, fn):
+    """Run `fn()` (one API call for `model`) under the rate limit, retrying
+    throttled and unavailable responses."""
+    tokens = request_tokens(contents)
+    attempt = 0
+    while True:
+        acquire(model, tokens)
+        try:
+            return fn()
+        except errors.APIError as e:
+            delay = _backoff(e, attempt, model)
+            if delay is None:
+                raise
+        time.sleep(delay)
+        attempt += 1
+
+
+def call_stream(model, contents, fn):
+    """`call` for a streaming API call opened by `fn()`. Errors surface on
+    the first chunk, so only opening the stream and reading that chunk is
+    retried; nothing already handed to the caller is repeated."""
+
+    def start():
+        stream = iter(fn())
+        first = next(stream, None)
+        return itertools.chain([first] if first else [], stream)
+
+    return call(model, contents, start)
+
+
+async def acall(model, contents, fn):
+    tokens = request_tokens(contents)
+    attempt = 0
+    while True:
+        await aacquire(model, tokens)
+        try:
+            return await fn()
+        except errors.APIError as e:
+            delay = _backoff(e, attempt, model)
+            if delay is None:
+                raise
+        await asyncio.sleep(delay)
+        attempt += 1
@@ -0,0 +1,204 @@
+"""Resolve Gemini grounding redirects (vertexaisearch.cloud.google.com) to
+the URLs they point at.
+
+The redirect service answers a HEAD with a 30x and a Location header, so
+there is no need to follow it to the target site; requests go out over a
+small pool of keep-alive connections to the one redirect host, run
+concurrently, and are bounded by an overall deadline after which any
+unresolved link is returned unchanged.
+
+Results are kept in $XDG_CACHE_HOME/gski/redirects.sqlite: targets for
+POSITIVE_TTL, failures for NEGATIVE_TTL so a dead link isn't retried on
+every run. GSKI_NO_CACHE=1 bypasses it.
+"""
+
+import http.client
+import os
+import queue
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+from .paths import CACHE_DIR
+
+REDIRECT_HOST = "vertexaisearch.cloud.google.com"
+
+DEFAULT_DEADLINE = 3.0
+MAX_WORKERS = 8
+
+DB_PATH = CACHE_DIR / "redirects.sqlite"
+POSITIVE_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS redirects (
+    url     TEXT PRIMARY KEY,
+    target  TEXT,
+    expires REAL NOT NULL
+);
+"""
+
+_pool = queue.LifoQueue()
+
+
+def is_redirect(url):
+    return urlsplit(url).hostname == REDIRECT_HOST
+
+
+# ---------------------------------------------------------------------------
+# cache
+
+
+def _connect():
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+def cache_get(urls):
+    """{url: target or None} for live cache entries; None marks a cached
+    failure."""
+    if os.environ.get("GSKI_NO_CACHE") or not urls:
+        return {}
+    urls = list(urls)
+    db = _connect()
+    try:
+        found = {}
+        for i in range(0, len(urls), 500):
+            batch = urls[i : i + 500]
+            marks = ",".join("?" * len(batch))
+            found.update(
+                db.execute(
+                    f"SELECT url, target FROM redirects "
+                    f"WHERE expires > ? AND url IN ({marks})",
+                    (time.time(), *batch),
+                ).fetchall()
+            )
+        return found
+    finally:
+        db.close()
+
+
+def cache_put(results):
+    """Store {url: target or None}; None records a failed lookup."""
+    if os.environ.get("GSKI_NO_CACHE") or not results:
+        return
+    now = time.time()
+    rows = [
+        (u, t, now + (POSITIVE_TTL if t else NEGATIVE_TTL)) for u, t in results.items()
+    ]
+    db = _connect()
+    try:
+        db.execute("BEGIN IMMEDIATE")
+        db.executemany("INSERT OR REPLACE INTO redirects VALUES (?, ?, ?)", rows)
+        db.execute("DELETE FROM redirects WHERE expires <= ?", (now,))
+        db.execute("COMMIT")
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# network
+
+
+def _connection(timeout):
+    try:
+        conn = _pool.get_nowait()
+    except queue.Empty:
+        conn = http.client.HTTPSConnection(REDIRECT_HOST, timeout=timeout)
+    conn.timeout = timeout
+    if conn.sock is not None:
+        conn.sock.settimeout(timeout)
+    return conn
+
+
+def _head(conn, path):
+    conn.request("HEAD", path, headers={"User-Agent": "gski/1.0"})
+    resp = conn.getresponse()
+    resp.read()
+    if resp.will_close:
+        conn.close()
+    if 300 <= resp.status < 400:
+        return resp.getheader("Location") or ""
+    return ""
+
+
+def fetch_target(url, timeout=DEFAULT_DEADLINE):
+    """Location the redirect points at, "" if the service answered without
+    one (a dead link), or None if it couldn't be reached. Uncached."""
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+    # a pooled connection may have been closed by the server while idle;
+    # retry once on a fresh one
+    for _ in range(2):
+        conn = _connection(timeout)
+        try:
+            location = _head(conn, path)
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            continue
+        _pool.put(conn)
+        return location
+    return None
+
+
+def resolve_url(url, timeout=DEFAULT_DEADLINE):
+    """Target of one redirect link, or `url` itself if it can't be had."""
+    return resolve_many([url], deadline=timeout)[url]
+
+
+def resolve_many(urls, deadline=DEFAULT_DEADLINE):
+    """Resolve `urls` concurrently, consulting the cache first. Returns
+    {url: target}; failed links and links still pending when `deadline`
+    seconds have passed map to themselves."""
+    results = {u: u for u in urls}
+    todo = [u for u in dict.fromkeys(urls) if is_redirect(u)]
+    cached = cache_get(todo)
+    for u, target in cached.items():
+        results[u] = target or u
+    todo = [u for u in todo if u not in cached]
+    if not todo:
+        return results
+
+    work = queue.Queue()
+    for u in todo:
+        work.put(u)
+    end = time.monotonic() + deadline
+    lock = threading.Lock()
+    fetched = {}
+
+    def worker():
+        while True:
+            try:
+                u = work.get_nowait()
+            except queue.Empty:
+                return
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            target = fetch_target(u, timeout=remaining)
+            with lock:
+                fetched[u] = target
+
+    # daemon threads: a hung socket must not keep the process alive past
+    # the deadline
+    threads = [
+        threading.Thread(target=worker, daemon=True)
+        for _ in range(min(MAX_WORKERS, len(todo)))
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(max(0, end - time.monotonic()))
+
+    with lock:
+        fetched = dict(fetched)
+    # unreachable (None) isn't cached; a definitive "" is, as a failure
+    cache_put({u: t or None for u, t in fetched.items() if t is not None})
+    for u, target in fetched.items():
+        results[u] = target or u
+    return results
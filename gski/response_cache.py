@@ -0,0 +1,198 @@
+"""On-disk memoization of generate_content responses.
+
+Entries are keyed by model, a digest of the request contents and the
+GenerateContentConfig, expire after a per-command TTL, and are evicted
+least-recently-used once the cache grows past GSKI_RESPONSE_CACHE_MB.
+Set GSKI_NO_CACHE=1 to bypass it entirely.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+
+from google.genai import types
+
+from . import ratelimit
+from .paths import CACHE_DIR
+
+DB_PATH = CACHE_DIR / "responses.sqlite"
+
+DEFAULT_MAX_MB = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key      TEXT PRIMARY KEY,
+    command  TEXT NOT NULL,
+    created  REAL NOT NULL,
+    accessed REAL NOT NULL,
+    expires  REAL NOT NULL,
+    size     INTEGER NOT NULL,
+    payload  BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed);
+"""
+
+
+def enabled():
+    return not os.environ.get("GSKI_NO_CACHE")
+
+
+def max_bytes():
+    mb = os.environ.get("GSKI_RESPONSE_CACHE_MB")
+    return int(float(mb) * 1024 * 1024) if mb else DEFAULT_MAX_MB * 1024 * 1024
+
+
+def connect():
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    db = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(SCHEMA)
+    return db
+
+
+# ---------------------------------------------------------------------------
+# keys
+
+
+def _digest_part(h, part):
+    if isinstance(part, str):
+        h.update(b"s")
+        h.update(part.encode())
+    elif isinstance(part, (types.Part, types.Content, types.File)):
+        h.update(type(part).__name__.encode())
+        h.update(part.model_dump_json(exclude_none=True).encode())
+    elif isinstance(part, (list, tuple)):
+        h.update(b"[")
+        for p in part:
+            _digest_part(h, p)
+        h.update(b"]")
+    elif hasattr(part, "tobytes") and hasattr(part, "mode"):
+        # PIL image: hash decoded pixels rather than re-encoding to PNG
+        h.update(f"img:{part.mode}:{part.size}".encode())
+        h.update(part.tobytes())
+    else:
+        h.update(repr(part).encode())
+    h.update(b"\0")
+
+
+def request_key(model, contents, config):
+    h = hashlib.sha256()
+    h.update(model.encode())
+    h.update(b"\0")
+    _digest_part(h, contents)
+    if config is not None:
+        h.update(config.model_dump_json(exclude_none=True).encode())
+    return h.hexdigest()
+
+
+# ---------------------------------------------------------------------------
+# storage
+
+
+def get(key):
+    db = connect()
+    try:
+        now = time.time()
+        row = db.execute(
+            "SELECT payload FROM responses WHERE key = ? AND expires > ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        return types.GenerateContentResponse.model_validate_json(row[0])
+    finally:
+        db.close()
+
+
+def _evict(db, limit):
+    now = time.time()
+    db.execute("DELETE FROM responses WHERE expires <= ?", (now,))
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= limit:
+        return
+    excess = total - limit
+    doomed = []
+    for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed"):
+        doomed.append((key,))
+        excess -= size
+        if excess <= 0:
+            break
+    db.executemany("DELETE FROM responses WHERE key = ?", doomed)
+
+
+def put(key, command, ttl, response):
+    if not getattr(response, "candidates", None):
+        return
+    payload = response.model_dump_json(exclude_none=True).encode()
+    db = connect()
+    try:
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        db.execute(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, command, now, now, now + ttl, len(payload), payload),
+        )
+        _evict(db, max_bytes())
+        db.execute("COMMIT")
+    finally:
+        db.close()
+
+
+# ---------------------------------------------------------------------------
+# call wrappers
+
+
+def _call(client, request):
+    return ratelimit.call(
+        request["model"],
+        request["contents"],
+        lambda: client.models.generate_content(**request),
+    )
+
+
+def _acall(client, request):
+    return ratelimit.acall(
+        request["model"],
+        request["contents"],
+        lambda: client.aio.models.generate_content(**request),
+    )
+
+
+def generate(client, command, ttl, fresh=False, **request):
+    """client.models.generate_content, served from the cache when possible.
+    `fresh` skips the lookup but still stores the new response."""
+    if not enabled():
+        return _call(client, request)
+
+    key = request_key(request["model"], request["contents"], request.get("config"))
+    if not fresh:
+        cached = get(key)
+        if cached is not None:
+            return cached
+
+    response = _call(client, request)
+    put(key, command, ttl, response)
+    return response
+
+
+async def agenerate(client, command, ttl, fresh=False, **request):
+    if not enabled():
+        return await _acall(client, request)
+
+    # hashing the contents and sqlite (which may wait on a lock) are
+    # blocking; run them off the event loop
+    key = await asyncio.to_thread(
+        request_key, request["model"], request["contents"], request.get("config")
+    )
+    if not fresh:
+        cached = await asyncio.to_thread(get, key)
+        if cached is not None:
+            return cached
+
+    response = await _acall(client, request)
+    await asyncio.to_thread(put, key, command, ttl, response)
+    return response
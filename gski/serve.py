@@ -0,0 +1,427 @@
+import contextvars
+import io
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+from contextlib import contextmanager
+
+# Wire format: 1-byte kind + 4-byte big-endian length + payload.
+#   client -> daemon: h (json request), i (stdin chunk; empty = EOF)
+#   daemon -> client: o (stdout), e (stderr), r (send stdin), x (exit code),
+#                     l (environment differs; run locally instead)
+HEADER = struct.Struct(">cI")
+CHUNK = 64 * 1024
+
+# Environment that changes what a command does (credentials, state/cache
+# paths, gski knobs). Module-level paths and clients are fixed when the
+# daemon starts, so a caller whose values differ runs locally.
+ENV_NAMES = {"HOME", "HTTP_PROXY", "HTTPS_PROXY", "NO_PROXY"}
+ENV_PREFIXES = ("GSKI_", "XDG_", "GEMINI_", "GOOGLE_", "OPENAI_")
+
+
+def socket_path():
+    if os.environ.get("GSKI_SOCKET"):
+        return os.environ["GSKI_SOCKET"]
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "gski.sock")
+    return os.path.join(tempfile.gettempdir(), f"gski-{os.getuid()}.sock")
+
+
+def relevant_env(environ=None):
+    environ = os.environ if environ is None else environ
+    return {
+        k: v
+        for k, v in environ.items()
+        if (k.upper() in ENV_NAMES or k.startswith(ENV_PREFIXES))
+        and k not in ("GSKI_NO_DAEMON", "XDG_RUNTIME_DIR", "GSKI_SOCKET")
+    }
+
+
+def _send(sock, kind, payload=b""):
+    sock.sendall(HEADER.pack(kind, len(payload)) + payload)
+
+
+def _recv_exact(sock, n):
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv(sock):
+    header = _recv_exact(sock, HEADER.size)
+    if header is None:
+        return None, None
+    kind, n = HEADER.unpack(header)
+    payload = _recv_exact(sock, n) if n else b""
+    if payload is None:
+        return None, None
+    return kind, payload
+
+
+# ---------------------------------------------------------------------------
+# client side
+
+
+def _stream_stdin(sock):
+    stdin = getattr(sys.stdin, "buffer", None)
+    try:
+        if stdin is not None:
+            while True:
+                chunk = (
+                    stdin.read1(CHUNK) if hasattr(stdin, "read1") else stdin.read(CHUNK)
+                )
+                if not chunk:
+                    break
+                _send(sock, b"i", chunk)
+        _send(sock, b"i")
+    except OSError:
+        # the command finished without reading all of stdin
+        pass
+
+
+def forward(argv):
+    """Run argv on the daemon. Returns its exit code, or None if no daemon is
+    listening (or it runs with a different environment) and the caller
+    should run the command locally."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path())
+    except OSError:
+        sock.close()
+        return None
+
+    request = {
+        "argv": argv,
+        "cwd": os.getcwd(),
+        "stdin_tty": bool(sys.stdin and sys.stdin.isatty()),
+        "env": relevant_env(),
+    }
+    with sock:
+        _send(sock, b"h", json.dumps(request).encode())
+        while True:
+            kind, payload = _recv(sock)
+            if kind is None:
+                print("error: gski daemon closed the connection", file=sys.stderr)
+                return 1
+            if kind == b"o":
+                try:
+                    sys.stdout.buffer.write(payload)
+                    sys.stdout.buffer.flush()
+                except BrokenPipeError:
+                    # reader went away (e.g. `| head`); stop like a local run would
+                    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+                    return 1
+            elif kind == b"e":
+                sys.stderr.buffer.write(payload)
+                sys.stderr.buffer.flush()
+            elif kind == b"r":
+                # stdin goes out on its own thread so output frames keep
+                # being read; otherwise both sides can block on full buffers
+                threading.Thread(
+                    target=_stream_stdin, args=(sock,), daemon=True
+                ).start()
+            elif kind == b"x":
+                return int(payload)
+            elif kind == b"l":
+                return None
+
+
+# ---------------------------------------------------------------------------
+# daemon side
+
+# {"stdout": ..., "stderr": ..., "stdin": ...} of the request being handled.
+# A contextvar rather than a thread-local so it follows the request into
+# asyncio tasks, asyncio.to_thread and (see _inherit_context) other threads.
+_streams = contextvars.ContextVar("gski_streams", default=None)
+
+
+def _inherit_context():
+    """Run every thread in a copy of the context of the thread that started
+    it, so pool workers and helper threads spawned while handling a request
+    write to that request's client."""
+    start = threading.Thread.start
+
+    def start_in_context(self):
+        ctx = contextvars.copy_context()
+        run = self.run
+        self.run = lambda: ctx.run(run)
+        start(self)
+
+    threading.Thread.start = start_in_context
+
+
+class _Router:
+    """Stand-in for sys.stdout/stderr/stdin that routes to the stream of the
+    request being handled in the current context."""
+
+    def __init__(self, name, default):
+        self._name = name
+        self._default = default
+
+    def _target(self):
+        streams = _streams.get()
+        return streams[self._name] if streams else self._default
+
+    def __getattr__(self, attr):
+        return getattr(self._target(), attr)
+
+    def write(self, s):
+        return self._target().write(s)
+
+    def flush(self):
+        return self._target().flush()
+
+    def isatty(self):
+        return self._target().isatty()
+
+
+class _Output(io.TextIOBase):
+    def __init__(self, sock, kind, lock):
+        self._sock = sock
+        self._kind = kind
+        # worker threads of one request share its socket
+        self._lock = lock
+
+    @property
+    def encoding(self):
+        return "utf-8"
+
+    def writable(self):
+        return True
+
+    def write(self, s):
+        if s:
+            with self._lock:
+                _send(self._sock, self._kind, s.encode("utf-8", "replace"))
+        return len(s)
+
+
+class _RemoteStdin(io.RawIOBase):
+    """Pulls the client's stdin on first read, so commands that never touch
+    stdin never block on a pipe the caller left open."""
+
+    def __init__(self, sock, tty):
+        self._sock = sock
+        self._tty = tty
+        self._requested = False
+        self._eof = False
+        self._pending = b""
+
+    def readable(self):
+        return True
+
+    def isatty(self):
+        return self._tty
+
+    def readinto(self, b):
+        if not self._pending and not self._eof:
+            if not self._requested:
+                _send(self._sock, b"r")
+                self._requested = True
+            kind, payload = _recv(self._sock)
+            if kind != b"i" or not payload:
+                self._eof = True
+            else:
+                self._pending = payload
+        n = min(len(b), len(self._pending))
+        b[:n] = self._pending[:n]
+        self._pending = self._pending[n:]
+        return n
+
+
+class _CwdGate:
+    """Requests from the same directory run concurrently; a request from a
+    different one waits until the process is idle and then chdirs."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._cwd = os.getcwd()
+        self._active = 0
+
+    @contextmanager
+    def enter(self, cwd):
+        with self._cond:
+            while self._active and self._cwd != cwd:
+                self._cond.wait()
+            if self._cwd != cwd:
+                os.chdir(cwd)
+                self._cwd = cwd
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active -= 1
+                self._cond.notify_all()
+
+
+def _exit_code(exc):
+    code = exc.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _handle(conn, gate):
+    from gski.cli import dispatch
+
+    with conn:
+        kind, payload = _recv(conn)
+        if kind != b"h":
+            return
+        request = json.loads(payload)
+
+        if request.get("stop"):
+            _send(conn, b"x", b"0")
+            os.kill(os.getpid(), signal.SIGTERM)
+            return
+
+        if request.get("env", {}) != relevant_env():
+            _send(conn, b"l")
+            return
+
+        lock = threading.Lock()
+        token = _streams.set(
+            {
+                "stdout": _Output(conn, b"o", lock),
+                "stderr": _Output(conn, b"e", lock),
+                "stdin": io.TextIOWrapper(
+                    io.BufferedReader(
+                        _RemoteStdin(conn, request.get("stdin_tty", False))
+                    ),
+                    encoding="utf-8",
+                ),
+            }
+        )
+        code = 0
+        try:
+            with gate.enter(request["cwd"]):
+                dispatch(request["argv"])
+        except SystemExit as e:
+            code = _exit_code(e)
+        except BrokenPipeError:
+            return
+        except Exception:
+            traceback.print_exc()
+            code = 1
+        finally:
+            _streams.reset(token)
+
+        try:
+            _send(conn, b"x", str(code).encode())
+        except OSError:
+            pass
+
+
+def warm_up():
+    from gski.cli import COMMANDS, load_command
+    from gski.clients import gemini_client, openai_client
+
+    for name in COMMANDS:
+        if name == "serve":
+            continue
+        try:
+            load_command(name)
+        except Exception as e:
+            print(f"  ! could not preload {name}: {e}", file=sys.stderr)
+
+    if os.environ.get("GEMINI_API_KEY"):
+        gemini_client()
+    if os.environ.get("OPENAI_API_KEY"):
+        try:
+            openai_client()
+        except ImportError:
+            pass
+
+
+def _bind(path):
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        if os.path.exists(path):
+            os.unlink(path)
+    else:
+        probe.close()
+        print(f"error: gski daemon already running on {path}", file=sys.stderr)
+        sys.exit(1)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177)
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(64)
+    return server
+
+
+def register(subparsers):
+    p = subparsers.add_parser(
+        "serve",
+        help="run a resident daemon that keeps clients warm for other invocations",
+    )
+    p.add_argument(
+        "--socket",
+        help="unix socket path (default: $GSKI_SOCKET, else $XDG_RUNTIME_DIR/gski.sock)",
+    )
+    p.add_argument(
+        "--stop", action="store_true", help="stop the running daemon and exit"
+    )
+    p.set_defaults(func=run)
+
+
+def run(args):
+    if args.socket:
+        os.environ["GSKI_SOCKET"] = args.socket
+    path = socket_path()
+
+    if args.stop:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            print(f"error: no gski daemon on {path}", file=sys.stderr)
+            sys.exit(1)
+        with sock:
+            _send(sock, b"h", json.dumps({"stop": True}).encode())
+            _recv(sock)
+        print(f"stopped daemon on {path}")
+        return
+
+    server = _bind(path)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    sys.stdout = _Router("stdout", sys.__stdout__)
+    sys.stderr = _Router("stderr", sys.__stderr__)
+    sys.stdin = _Router("stdin", sys.__stdin__)
+    _inherit_context()
+
+    warm_up()
+    print(f"gski daemon listening on {path}", file=sys.__stderr__)
+
+    gate = _CwdGate()
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_handle, args=(conn, gate), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(path):
+            os.unlink(path)
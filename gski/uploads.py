@@ -0,0 +1,129 @@
+import hashlib
+import json
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from google.genai import types
+
+from .paths import CACHE_DIR, write_atomic
+
+INDEX_PATH = CACHE_DIR / "uploads.json"
+
+# Files API objects live for 48h; don't hand out a handle about to expire.
+DEFAULT_TTL = timedelta(hours=48)
+EXPIRY_MARGIN = timedelta(hours=1)
+
+HASH_CHUNK = 1024 * 1024
+
+_index_lock = threading.Lock()
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def load_index():
+    try:
+        index = json.loads(INDEX_PATH.read_text())
+    except (FileNotFoundError, ValueError):
+        index = {}
+    index.setdefault("files", {})
+    index.setdefault("paths", {})
+    return index
+
+
+def save_index(index):
+    # merge with what is on disk so concurrent uploads don't drop each
+    # other's entries
+    with _index_lock:
+        merged = load_index()
+        merged["files"].update(index["files"])
+        merged["paths"].update(index["paths"])
+        now = _now()
+        merged["files"] = {
+            sha: e
+            for sha, e in merged["files"].items()
+            if datetime.fromisoformat(e["expires_at"]) > now
+        }
+        merged["paths"] = {
+            p: e for p, e in merged["paths"].items() if e["sha256"] in merged["files"]
+        }
+        write_atomic(INDEX_PATH, json.dumps(merged, indent=2))
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_hash(path, index):
+    """SHA-256 of the file, skipping the read when size and mtime match the
+    last time this path was hashed."""
+    st = path.stat()
+    key = str(path.resolve())
+    seen = index["paths"].get(key)
+    if seen and seen["size"] == st.st_size and seen["mtime_ns"] == st.st_mtime_ns:
+        return seen["sha256"]
+    sha = file_sha256(path)
+    index["paths"][key] = {
+        "sha256": sha,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+    }
+    return sha
+
+
+def _state(f):
+    state = getattr(f, "state", None)
+    return getattr(state, "name", state)
+
+
+def wait_active(client, f, interval=2):
+    while _state(f) == "PROCESSING":
+        time.sleep(interval)
+        f = client.files.get(name=f.name)
+    if _state(f) == "FAILED":
+        print(f"error: processing of uploaded file {f.name} failed", file=sys.stderr)
+        sys.exit(1)
+    return f
+
+
+def upload(client, path, mime_type):
+    """Upload `path` through the Files API, reusing an earlier upload of the
+    same content while it is still live. Returns (uri, mime_type)."""
+    p = Path(path)
+    index = load_index()
+    sha = content_hash(p, index)
+
+    entry = index["files"].get(sha)
+    if entry and datetime.fromisoformat(entry["expires_at"]) - EXPIRY_MARGIN > _now():
+        save_index(index)
+        return entry["uri"], entry["mime_type"]
+
+    print(f"uploading {path}...", file=sys.stderr)
+    f = client.files.upload(
+        file=str(p), config=types.UploadFileConfig(mime_type=mime_type)
+    )
+    f = wait_active(client, f)
+
+    expires = getattr(f, "expiration_time", None) or (_now() + DEFAULT_TTL)
+    index["files"][sha] = {
+        "name": f.name,
+        "uri": f.uri,
+        "mime_type": f.mime_type or mime_type,
+        "size": p.stat().st_size,
+        "expires_at": expires.isoformat(),
+    }
+    save_index(index)
+    return f.uri, f.mime_type or mime_type
+
+
+def uploaded_part(client, path, mime_type):
+    uri, mime = upload(client, path, mime_type)
+    return types.Part.from_uri(file_uri=uri, mime_type=mime)
@@ -1,68 +1,148 @@
+import asyncio
 import os
 import sys
-import urllib.request
+from concurrent.futures import ThreadPoolExecutor
 
-from google import genai
 from google.genai import types
 
+from . import jsonl_batch, ratelimit, redirects, response_cache
+from .clients import gemini_client
 from .models import GEMINI_TEXT
 
 
 MODELS = {k: GEMINI_TEXT[k] for k in ("flash", "flash-lite")}
 
+RESPONSE_TTL = 3600  # search results go stale quickly
 
-def resolve_vertex_url(vertex_uri):
-    try:
-        req = urllib.request.Request(vertex_uri, method="HEAD")
-        req.add_header("User-Agent", "gski-websearch/1.0")
-        opener = urllib.request.build_opener(urllib.request.HTTPRedirectHandler)
-        resp = opener.open(req, timeout=5)
-        return resp.url
-    except Exception:
-        return vertex_uri
+MAX_SOURCES = 5
 
+SYSTEM_INSTRUCTION = "Always use Google Search to find the most current, up-to-date information before answering. Never rely on your training data alone."
 
-def resolve_chunks(chunks):
-    resolved = []
-    for chunk in chunks:
-        if not hasattr(chunk, "web") or not chunk.web:
-            continue
-        uri = chunk.web.uri or ""
-        title = chunk.web.title or ""
-        if "vertexaisearch.cloud.google.com" in uri:
-            uri = resolve_vertex_url(uri)
-        resolved.append({"uri": uri, "title": title})
-    return resolved
 
+def web_sources(chunks, limit=MAX_SOURCES):
+    return [
+        {"uri": chunk.web.uri or "", "title": chunk.web.title or ""}
+        for chunk in chunks
+        if getattr(chunk, "web", None)
+    ][:limit]
+
+
+def resolve_chunks(chunks, limit=MAX_SOURCES):
+    """The first `limit` web sources, with redirect links resolved."""
+    sources = web_sources(chunks, limit)
+    targets = redirects.resolve_many([s["uri"] for s in sources])
+    for s in sources:
+        s["uri"] = targets[s["uri"]]
+    return sources
 
-def format_output(response):
-    candidate = response.candidates[0]
-    text = response.text or ""
 
+def grounding(response):
+    """(resolved sources, search queries) from a grounded response."""
+    candidate = response.candidates[0] if response.candidates else None
     meta = getattr(candidate, "grounding_metadata", None)
     if not meta:
-        return text
-
+        return [], []
     chunks = getattr(meta, "grounding_chunks", None) or []
-    resolved = resolve_chunks(chunks)[:5]
+    queries = getattr(meta, "web_search_queries", None) or []
+    return resolve_chunks(chunks), list(queries)
 
+
+def format_sources(resolved, queries):
+    text = ""
     if resolved:
         text += "\n\n---\nSources:\n"
         for i, src in enumerate(resolved):
             text += f"[{i + 1}] {src['uri']}\n"
 
-    queries = getattr(meta, "web_search_queries", None) or []
     if queries:
         text += f"\nSearch queries: {', '.join(queries)}\n"
 
     return text
 
 
+def format_output(response):
+    return (response.text or "") + format_sources(*grounding(response))
+
+
+def stream_search(client, model, query, raw=False):
+    """Print the answer as it streams. Grounding metadata comes with the last
+    chunks; redirect resolution starts on a worker thread as soon as it
+    appears, so it overlaps the rest of the stream."""
+    config = build_config()
+
+    def open_stream():
+        return client.models.generate_content_stream(
+            model=model, contents=query, config=config
+        )
+
+    sources, queries, pending = [], [], None
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        for chunk in ratelimit.call_stream(model, query, open_stream):
+            if chunk.text:
+                sys.stdout.write(chunk.text)
+                sys.stdout.flush()
+            if raw or not chunk.candidates:
+                continue
+            meta = getattr(chunk.candidates[0], "grounding_metadata", None)
+            if not meta:
+                continue
+            queries = list(getattr(meta, "web_search_queries", None) or queries)
+            found = web_sources(getattr(meta, "grounding_chunks", None) or [])
+            if found and found != sources:
+                sources = found
+                pending = pool.submit(
+                    redirects.resolve_many, [s["uri"] for s in sources]
+                )
+
+        if raw:
+            sys.stdout.write("\n")
+            return
+        if pending is not None:
+            targets = pending.result()
+            for s in sources:
+                s["uri"] = targets[s["uri"]]
+    sys.stdout.write(format_sources(sources, queries) + "\n")
+    sys.stdout.flush()
+
+
+def build_config():
+    return types.GenerateContentConfig(
+        tools=[types.Tool(google_search=types.GoogleSearch())],
+        system_instruction=SYSTEM_INSTRUCTION,
+    )
+
+
+# ---------------------------------------------------------------------------
+# batch mode
+
+
+async def search_one(client, sem, args, query, index):
+    record = {"index": index, "query": query}
+    async with sem:
+        try:
+            response = await response_cache.agenerate(
+                client,
+                "websearch",
+                RESPONSE_TTL,
+                fresh=args.fresh,
+                model=MODELS[args.model],
+                contents=query,
+                config=build_config(),
+            )
+            sources, queries = await asyncio.to_thread(grounding, response)
+            record.update(
+                text=response.text or "", sources=sources, search_queries=queries
+            )
+        except Exception as e:
+            record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
 def register(subparsers):
     p = subparsers.add_parser(
         "websearch", help="search the web via Gemini with Google Search grounding"
     )
-    p.add_argument("query", help="search query or question")
+    p.add_argument("query", nargs="?", help="search query or question")
     p.add_argument(
         "--model",
         choices=list(MODELS.keys()),
@@ -74,6 +154,34 @@ def register(subparsers):
         action="store_true",
         help="print raw response text without citation formatting",
     )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="print the answer as it is generated; sources follow at the end",
+    )
+    p.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run one search per line of FILE concurrently ('-' for stdin); "
+        "results are written as JSONL",
+    )
+    p.add_argument(
+        "--concurrency",
+        "-c",
+        type=int,
+        default=8,
+        help="max in-flight searches in --batch mode (default: 8)",
+    )
+    p.add_argument(
+        "--ordered",
+        action="store_true",
+        help="emit --batch results in input order instead of completion order",
+    )
+    p.add_argument(
+        "--fresh",
+        action="store_true",
+        help="ignore cached responses and always call the API",
+    )
     p.set_defaults(func=run)
 
 
@@ -82,15 +190,34 @@ def run(args):
         print("error: GEMINI_API_KEY env var required", file=sys.stderr)
         sys.exit(1)
 
-    client = genai.Client()
+    if args.batch and args.stream:
+        print("error: --batch cannot be combined with --stream", file=sys.stderr)
+        sys.exit(1)
+
+    if args.batch:
+        queries = [line for _, line in jsonl_batch.read_lines(args.batch)]
+        if asyncio.run(jsonl_batch.run(args, queries, search_one, "search(es)")):
+            sys.exit(1)
+        return
+
+    if not args.query:
+        print("error: query required (or use --batch)", file=sys.stderr)
+        sys.exit(1)
+
+    client = gemini_client()
     model = MODELS[args.model]
 
-    config = types.GenerateContentConfig(
-        tools=[types.Tool(google_search=types.GoogleSearch())],
-        system_instruction="Always use Google Search to find the most current, up-to-date information before answering. Never rely on your training data alone.",
-    )
+    if args.stream:
+        stream_search(client, model, args.query, raw=args.raw)
+        return
+
+    config = build_config()
 
-    response = client.models.generate_content(
+    response = response_cache.generate(
+        client,
+        "websearch",
+        RESPONSE_TTL,
+        fresh=args.fresh,
         model=model,
         contents=args.query,
         config=config,
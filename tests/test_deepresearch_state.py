@@ -0,0 +1,36 @@
+import pytest
+
+from gski import deepresearch
+from gski.deepresearch_lib import state
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(state, "STATE_DIR", tmp_path)
+    monkeypatch.setattr(state, "DB_PATH", tmp_path / "jobs.sqlite")
+    monkeypatch.setattr(state, "LOCK_DIR", tmp_path / "locks")
+
+
+def running_job():
+    job = state.new_job(query="q", model="m", mode="direct", files=[])
+    state.record_interaction(job, "i1", "execute", "q")
+    job["state"] = "running"
+    state.save_job(job)
+    return job
+
+
+def test_stale_save_conflicts(store):
+    job = running_job()
+    stale = state.load_job(job["job_id"])
+    state.update_job(job, lambda current: current.update(state="failed"))
+
+    with pytest.raises(state.JobConflict):
+        state.save_job(stale)
+
+
+def test_fail_skips_a_removed_job(store, capsys):
+    job = running_job()
+    state.remove_job(state.load_job(job["job_id"]))
+
+    assert deepresearch._fail(job) is False
+    assert "removed by another process" in capsys.readouterr().err
@@ -0,0 +1,70 @@
+import asyncio
+import os
+import subprocess
+import sys
+from argparse import Namespace
+from pathlib import Path
+
+from gski import llm_process
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def test_dry_run_with_spilled_stdin(tmp_path):
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"x" * (20 << 20))
+    stdin = b"y" * (llm_process.STDIN_SPILL_BYTES + (1 << 20))
+    env = {**os.environ, "GSKI_NO_DAEMON": "1", "XDG_CACHE_HOME": str(tmp_path)}
+    env.pop("GEMINI_API_KEY", None)
+
+    r = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "from gski.cli import main; main()",
+            "llm-process",
+            "summarize",
+            "-f",
+            str(big),
+            "--dry-run",
+        ],
+        env=env,
+        cwd=ROOT,
+        input=stdin,
+        capture_output=True,
+        timeout=60,
+    )
+
+    assert r.returncode == 0, r.stderr.decode()
+    assert b"uploads:   2 file(s)" in r.stdout
+
+
+def test_malformed_job_is_reported_per_job():
+    args = Namespace(files=[], model="flash", fresh=False)
+    sem = asyncio.Semaphore(1)
+    job = {"id": "bad", "prompt": "x", "files": 5}
+
+    record = asyncio.run(llm_process.run_job(None, sem, args, job, 3))
+
+    assert record["index"] == 3
+    assert record["id"] == "bad"
+    assert record["error"].startswith("invalid job:")
+
+
+def test_files_are_sniffed_once(tmp_path, monkeypatch):
+    (tmp_path / "a.txt").write_text("hello")
+    (tmp_path / "b.png").write_bytes(b"\x89PNG\r\n\x1a\n\0")
+    (tmp_path / "c.bin").write_bytes(b"x\0y")
+    sniffed = []
+    looks_binary = llm_process.looks_binary
+    monkeypatch.setattr(
+        llm_process, "looks_binary", lambda p: sniffed.append(p) or looks_binary(p)
+    )
+
+    files, binary = llm_process.expand_files([str(tmp_path)])
+    parts = llm_process.build_contents("q", files, binary, None)
+
+    assert files == [str(tmp_path / "a.txt"), str(tmp_path / "b.png")]
+    assert binary == {str(tmp_path / "b.png")}
+    assert parts[0] == "--- a.txt ---\nhello"
+    assert len(sniffed) == 2  # a.txt and c.bin; .png goes by its mime type
@@ -0,0 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from gski.paths import write_atomic
+
+
+def test_concurrent_writes_from_threads(tmp_path):
+    path = tmp_path / "state.json"
+    texts = [str(i) * 10_000 for i in range(10)]
+
+    with ThreadPoolExecutor(10) as pool:
+        list(pool.map(lambda text: write_atomic(path, text), texts * 5))
+
+    assert path.read_text() in texts
+    assert [p.name for p in tmp_path.iterdir()] == ["state.json"]
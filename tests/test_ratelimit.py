@@ -0,0 +1,83 @@
+import pytest
+from google.genai import errors
+
+from gski import ratelimit
+
+
+class Clock:
+    def __init__(self, t=1000.0):
+        self.t = t
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def clock(tmp_path, monkeypatch):
+    monkeypatch.setattr(ratelimit, "DB_PATH", tmp_path / "ratelimit.sqlite")
+    monkeypatch.setattr(ratelimit, "CACHE_DIR", tmp_path)
+    monkeypatch.setenv("GSKI_RPM", "60")
+    monkeypatch.setenv("GSKI_TPM", "0")
+    c = Clock()
+    monkeypatch.setattr(ratelimit.time, "time", c)
+    return c
+
+
+def granted(clock, seconds, step):
+    n = 0
+    for _ in range(int(seconds / step)):
+        clock.t += step
+        n += ratelimit._take("m", 0) == 0
+    return n
+
+
+def test_full_bucket_grants_burst(clock):
+    assert sum(ratelimit._take("m", 0) == 0 for _ in range(60)) == 60
+    assert ratelimit._take("m", 0) == pytest.approx(1.0)
+
+
+def test_drained_bucket_refills_at_rate(clock):
+    for _ in range(60):
+        ratelimit._take("m", 0)
+    # checks far more often than the refill rate must not be credited the
+    # same elapsed time twice
+    assert 9 <= granted(clock, 10, 0.01) <= 10
+
+
+def test_drain_holds_bucket(clock):
+    ratelimit._drain("m", 5)
+    assert ratelimit._take("m", 0) == pytest.approx(5)
+    clock.t += 4.9
+    assert ratelimit._take("m", 0) == pytest.approx(0.1)
+    # refilling starts from empty once the hold is over
+    clock.t += 0.6
+    assert ratelimit._take("m", 0) == pytest.approx(0.5)
+    clock.t += 0.5
+    assert ratelimit._take("m", 0) == 0
+
+
+def test_tokens_bucket(clock, monkeypatch):
+    monkeypatch.setenv("GSKI_RPM", "0")
+    monkeypatch.setenv("GSKI_TPM", "600")
+    assert ratelimit._take("m", 600) == 0
+    assert ratelimit._take("m", 60) == pytest.approx(6)
+    clock.t += 6
+    assert ratelimit._take("m", 60) == 0
+
+
+def test_call_stream_retries_only_the_first_chunk(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit.time, "sleep", lambda s: None)
+    opened = []
+
+    def open_stream():
+        opened.append(1)
+        if len(opened) == 1:
+            raise errors.APIError(503, {"error": {"message": "unavailable"}})
+        yield "a"
+        raise errors.APIError(503, {"error": {"message": "unavailable"}})
+
+    chunks = ratelimit.call_stream("m", "q", open_stream)
+    assert next(chunks) == "a"
+    with pytest.raises(errors.APIError):
+        next(chunks)
+    assert len(opened) == 2
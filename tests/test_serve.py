@@ -0,0 +1,71 @@
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# the CLI with the offline SDK stand-ins from benchmarks/_stubs.py
+STUBBED = (
+    f"import sys; sys.path.insert(0, {str(ROOT / 'benchmarks')!r}); "
+    "import _stubs; _stubs.install(); "
+    "from gski.cli import main; main()"
+)
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "stub",
+        "GSKI_SOCKET": str(tmp_path / "gski.sock"),
+        "XDG_CACHE_HOME": str(tmp_path / "cache"),
+        "XDG_STATE_HOME": str(tmp_path / "state"),
+        "GSKI_NO_CACHE": "1",
+        "GSKI_RPM": "0",
+        "GSKI_TPM": "0",
+    }
+    env.pop("GSKI_NO_DAEMON", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-c", STUBBED, "serve"],
+        env=env,
+        cwd=ROOT,
+        stderr=subprocess.PIPE,
+    )
+    deadline = time.monotonic() + 30
+    while not (tmp_path / "gski.sock").exists():
+        assert proc.poll() is None, proc.stderr.read().decode()
+        assert time.monotonic() < deadline, "daemon did not start"
+        time.sleep(0.05)
+    yield env
+    proc.terminate()
+    proc.wait(10)
+
+
+def run(env, argv, stdin):
+    return subprocess.run(
+        [sys.executable, "-c", STUBBED, *argv],
+        env=env,
+        cwd=ROOT,
+        input=stdin,
+        capture_output=True,
+        timeout=60,
+    )
+
+
+def test_large_stdin_and_output_through_daemon(daemon):
+    # more stdin and more output than a socket buffer holds at once
+    stdin = b"".join(b"line %d %s\n" % (i, b"abc " * 8) for i in range(20_000))
+    argv = ["llm-process", "s", "--per-chunk", "--chunk-tokens", "10", "-c", "64"]
+
+    forwarded = run(daemon, argv, stdin)
+    local = run({**daemon, "GSKI_NO_DAEMON": "1"}, argv, stdin)
+
+    assert forwarded.returncode == 0, forwarded.stderr.decode()
+    assert local.returncode == 0, local.stderr.decode()
+    lines = forwarded.stdout.count(b"\n")
+    assert lines > 10_000
+    assert lines == local.stdout.count(b"\n")